@@ -1,11 +1,55 @@
-
 from dotenv import load_dotenv
+import logging
+import os
 import uvicorn
 from src import app
-from src.core.config import HOST,PORT,DEBUG
-from src.core.db_config import CONNECTION_STRING
+from src.core.config import (
+    HOST,
+    PORT,
+    DEBUG,
+    WORKERS,
+    KEEP_ALIVE_SECONDS,
+    BACKLOG,
+    LIMIT_CONCURRENCY,
+    GRACEFUL_TIMEOUT_SECONDS,
+    ACCESS_LOG,
+    JWT_SECRET,
+)
 
 load_dotenv()
-print('Mongo: ', CONNECTION_STRING)
+logger = logging.getLogger('app')
+
+def serve():
+    """DEBUG=true runs one auto-reloading process; otherwise WORKERS processes share the port.
+
+    Each worker imports this module on its own and opens its own Mongo client
+    in the app lifespan. SIGTERM/SIGINT stop accepting connections and give
+    in-flight requests GRACEFUL_TIMEOUT_SECONDS to finish. loop/http 'auto'
+    pick uvloop and httptools when they are installed (uvicorn[standard]).
+    """
+    if not os.getenv('JWT_SECRET'):
+        # workers are spawned and import config afresh; without a shared secret each would sign its own tokens
+        os.environ['JWT_SECRET'] = JWT_SECRET
+        logger.warning("JWT_SECRET is not set; tokens will not survive a restart")
+    if DEBUG:
+        uvicorn.run('app:app',host=HOST,port=int(PORT),reload=True,log_config=None)
+        return
+    logger.info("starting workers", extra={"workers": WORKERS, "host": HOST, "port": int(PORT)})
+    uvicorn.run(
+        'app:app',
+        host=HOST,
+        port=int(PORT),
+        workers=WORKERS,
+        loop='auto',
+        http='auto',
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS,
+        limit_concurrency=LIMIT_CONCURRENCY or None,
+        proxy_headers=True,
+        access_log=ACCESS_LOG,
+        log_config=None,
+    )
+
 if __name__ == "__main__":
-    uvicorn.run('app:app',host=HOST,port=int(PORT),reload=DEBUG)
\ No newline at end of file
+    serve()
@@ -0,0 +1,42 @@
+"""Fire N concurrent requests at a running API and report how much they overlap.
+
+    python benchmarks/concurrency.py --url http://127.0.0.1:5000/products -n 50
+
+With a blocking data layer the requests run one after another and the overlap
+ratio (sum of latencies / wall time) stays near 1. With the db executor it should
+approach min(n, DB_EXECUTOR_WORKERS).
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    with urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:5000/products')
+    parser.add_argument('-n', type=int, default=50)
+    args = parser.parse_args()
+
+    timed_get(args.url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.n) as pool:
+        latencies = sorted(pool.map(timed_get, [args.url] * args.n))
+    wall = time.perf_counter() - start
+
+    print(f"requests: {args.n}")
+    print(f"wall:     {wall * 1000:.1f} ms")
+    print(f"p50:      {latencies[len(latencies) // 2] * 1000:.1f} ms")
+    print(f"p99:      {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"overlap:  {sum(latencies) / wall:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""End-to-end load test: boots app.py in-process and drives the shopping flow.
+
+    python benchmarks/load.py --mongo memory --users 200 --products 500 --out bench.json
+    MONGO_URI=mongodb://127.0.0.1:27017 MONGO_DB=bench python benchmarks/load.py --users 1000
+
+Every virtual user registers, logs in, browses a few /products pages, adds
+items to the cart, checks out, pays and reads the order history. Each step
+runs as its own phase for all users (bounded by --concurrency), so Mongo
+commands seen by a pymongo CommandListener during a phase divide cleanly
+into commands per request. The in-memory stand-in (mongomock) sends no
+commands, so those counts are null there. Results go to --out as JSON so
+runs can be diffed between commits.
+
+A real mongod gives representative numbers. Point MONGO_DB at a scratch
+database, because the products and orders collections are wiped first.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from pymongo import monitoring
+
+BACK_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACK_DIR))
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self.commands += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Recorder:
+    def __init__(self, counter):
+        self.counter = counter
+        self.routes = {}
+
+    async def phase(self, route, calls, concurrency):
+        """Run calls (coroutine factories) for one route and record latency and Mongo commands."""
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors, results = [], 0, []
+
+        async def timed(call):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await call()
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+                return response
+
+        commands_before = self.counter.commands
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(call) for call in calls))
+        wall = time.perf_counter() - start
+        commands = self.counter.commands - commands_before
+
+        stats = self.routes.setdefault(route, {'latencies': [], 'errors': 0, 'wall': 0.0, 'commands': 0})
+        stats['latencies'] += latencies
+        stats['errors'] += errors
+        stats['wall'] += wall
+        stats['commands'] += commands
+        return results
+
+    def report(self, count_commands):
+        report = {}
+        for route, stats in self.routes.items():
+            count = len(stats['latencies'])
+            report[route] = {
+                'requests': count,
+                'errors': stats['errors'],
+                'throughput_rps': round(count / stats['wall'], 1) if stats['wall'] else None,
+                'p50_ms': round(percentile(stats['latencies'], 0.50) * 1000, 2),
+                'p95_ms': round(percentile(stats['latencies'], 0.95) * 1000, 2),
+                'p99_ms': round(percentile(stats['latencies'], 0.99) * 1000, 2),
+                'mongo_commands_per_request': round(stats['commands'] / count, 2) if count_commands and count else None,
+            }
+        return report
+
+
+def use_memory_mongo():
+    import mongoengine
+    import mongomock
+
+    # mongomock predates the `sort` option pymongo 4.11 added to UpdateOne, which bulk_write passes through
+    from mongomock.collection import BulkOperationBuilder
+    add_update = BulkOperationBuilder.add_update
+    BulkOperationBuilder.add_update = lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+
+    connect = mongoengine.connect
+    mongoengine.connect = lambda *args, **kwargs: connect(*args, mongo_client_class=mongomock.MongoClient, **kwargs)
+    os.environ.setdefault('MONGO_URI', 'mongodb://localhost')
+    os.environ.setdefault('MONGO_DB', 'bench')
+
+
+def start_server(app):
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning', access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def seed_products(count):
+    from src.models.user import Product, Order, Cart, Payment
+
+    for document in (Product, Order, Cart, Payment):
+        document.objects.delete()
+    Product.objects.insert([
+        Product(name=f"product {n}", description=f"benchmark product {n}", price=1 + n % 50, image_url="", stock=10 ** 6)
+        for n in range(count)
+    ])
+
+
+async def drive(base_url, recorder, args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        run_id = int(time.time())
+        people = [
+            {'email': f"bench{run_id}-{n}@example.com", 'first_name': 'Bench', 'last_name': str(n), 'password': 'benchmark'}
+            for n in range(args.users)
+        ]
+        await recorder.phase('POST /register', [lambda p=p: client.post('/register', json=p) for p in people], args.concurrency)
+        logins = await recorder.phase('POST /login', [
+            lambda p=p: client.post('/login', json={'email': p['email'], 'password': p['password']}) for p in people
+        ], args.concurrency)
+        sessions = [
+            (body['id'], {'Authorization': f"Bearer {body['access_token']}"})
+            for body in (response.json() for response in logins) if 'access_token' in body
+        ]
+
+        product_ids = []
+        cursors = [None] * len(sessions)
+        for _ in range(args.pages):
+            pages = await recorder.phase('GET /products', [
+                lambda cursor=cursor: client.get('/products', params={'limit': 20, **({'cursor': cursor} if cursor else {})})
+                for cursor in cursors
+            ], args.concurrency)
+            cursors = [page.json().get('next_cursor') for page in pages]
+            product_ids = product_ids or [item['id'] for item in pages[0].json()['items']]
+
+        for _ in range(args.cart_items):
+            await recorder.phase('POST /cart/{user_id}', [
+                lambda user_id=user_id, headers=headers: client.post(
+                    f'/cart/{user_id}', headers=headers,
+                    json={'product_id': random.choice(product_ids), 'quantity': 1},
+                )
+                for user_id, headers in sessions
+            ], args.concurrency)
+
+        carts = await recorder.phase('GET /cart/{user_id}', [
+            lambda user_id=user_id, headers=headers: client.get(f'/cart/{user_id}', headers=headers)
+            for user_id, headers in sessions
+        ], args.concurrency)
+        orders = await recorder.phase('POST /orders', [
+            lambda cart=cart, headers=headers: client.post('/orders', headers=headers, json={'cart_id': cart.json()['id']})
+            for cart, (_, headers) in zip(carts, sessions)
+        ], args.concurrency)
+        await recorder.phase('POST /payment', [
+            lambda order=order, headers=headers: client.post(
+                '/payment', headers=headers, json={'order_id': order.json().get('id', ''), 'payment_method': 'card'},
+            )
+            for order, (_, headers) in zip(orders, sessions)
+        ], args.concurrency)
+        await recorder.phase('GET /orders/{user_id}', [
+            lambda user_id=user_id, headers=headers: client.get(f'/orders/{user_id}', headers=headers)
+            for user_id, headers in sessions
+        ], args.concurrency)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACK_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo', choices=['uri', 'memory'], default='uri', help="MONGO_URI/MONGO_DB or an in-memory stand-in")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--pages', type=int, default=3, help="/products pages each user browses")
+    parser.add_argument('--cart-items', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='bench_output.json')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    counter = CommandCounter()
+    monitoring.register(counter)
+    if args.mongo == 'memory':
+        use_memory_mongo()
+    os.chdir(BACK_DIR)
+    import app as entry
+    from src.core.db_config import connect_db
+
+    connect_db()
+    seed_products(args.products)
+    server, thread, base_url = start_server(entry.app)
+    recorder = Recorder(counter)
+    try:
+        asyncio.run(drive(base_url, recorder, args))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    result = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': vars(args),
+        'routes': recorder.report(count_commands=args.mongo == 'uri'),
+    }
+    with open(args.out, 'w') as out:
+        json.dump(result, out, indent=2)
+
+    print(f"{'route':<24}{'reqs':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'mongo/req':>11}")
+    for route, stats in result['routes'].items():
+        commands = stats['mongo_commands_per_request']
+        print(f"{route:<24}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{commands if commands is not None else '-':>11}")
+    print(f"results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Zipf-distributed product lookups with and without the product cache.
+
+    MONGO_DB=bench python benchmarks/product_cache.py --products 1000 --lookups 20000
+
+Seeds products into MONGO_DB, so point it at a scratch database. Mongo
+queries are counted with a pymongo CommandListener, so the numbers are what
+the server actually saw.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from pymongo import monitoring
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FindCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.finds = 0
+
+    def started(self, event):
+        if event.command_name == 'find' and event.command.get('find') == 'products':
+            self.finds += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = FindCounter()
+monitoring.register(counter)
+
+from src.core.db_config import connect_db  # noqa: E402
+from src.models.user import Product, product_cache  # noqa: E402
+
+
+def run(label, lookup, ids):
+    counter.finds = 0
+    start = time.perf_counter()
+    for product_id in ids:
+        lookup(product_id)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {len(ids) / elapsed:>10.0f} lookups/s  {counter.finds:>7} mongo finds  "
+          f"{counter.finds / elapsed:>8.0f} finds/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--skew', type=float, default=1.1, help="Zipf exponent")
+    args = parser.parse_args()
+    # the client picks up listeners registered before it is created
+    connect_db()
+
+    Product.objects.delete()
+    products = [
+        Product(name=f"product {n}", description="benchmark", price=n, image_url="", stock=100)
+        for n in range(args.products)
+    ]
+    ids = [product.pk for product in Product.objects.insert(products)]
+    weights = [1 / rank ** args.skew for rank in range(1, len(ids) + 1)]
+    workload = random.choices(ids, weights=weights, k=args.lookups)
+
+    run('direct', lambda product_id: Product.objects(id=product_id).first(), workload)
+    run('cached', product_cache.get, workload)
+    print(f"cache stats: {product_cache.stats}")
+
+
+if __name__ == '__main__':
+    main()
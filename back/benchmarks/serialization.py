@@ -0,0 +1,151 @@
+"""Serialization cost and bytes on the wire for /products and /orders/{user_id}.
+
+    python benchmarks/serialization.py --products 100 --orders 50 --items 4
+
+Builds representative payloads in memory (no database) from the real
+documents' summary()/dict() methods and times three ways of producing a
+body from them:
+
+  default    FastAPI's path without a response model: jsonable_encoder + json.dumps
+  validated  the response_model path: validate into a pydantic model, dump, json.dumps
+  fast       fast_json: orjson (or the stdlib fallback) straight from the dicts
+
+Then reports the body size raw, gzipped and brotli-compressed at the levels
+the compression middleware uses. --inline-images makes every image_url a
+base64 data URL, like products created before the image store existed.
+"""
+import argparse
+import base64
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+from bson import ObjectId
+from pydantic import BaseModel
+
+BACK_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACK_DIR))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from src.core.config import GZIP_LEVEL, BROTLI_QUALITY  # noqa: E402
+from src.core.compression import brotli  # noqa: E402
+from src.core.responses import fast_json, orjson  # noqa: E402
+from src.models.model import ProductPage  # noqa: E402
+from src.models.user import Product, Order, OrderItem  # noqa: E402
+
+
+class OrderHistory(BaseModel):
+    orders: List[Dict[str, Any]]
+
+
+def build_products(count, inline_images):
+    now = datetime.now()
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(24_000)).decode() if inline_images else ""
+    return [
+        Product(
+            id=ObjectId(),
+            name=f"Product {n}",
+            description="A reasonably descriptive product blurb " * 4,
+            price=round(random.uniform(1, 500), 2),
+            image_url=image or f"http://127.0.0.1:5000/images/{os.urandom(32).hex()}",
+            stock=random.randint(0, 100),
+            created_at=now - timedelta(minutes=n),
+            updated_at=now - timedelta(minutes=n),
+        )
+        for n in range(count)
+    ]
+
+
+def build_orders(count, items, products):
+    user = ObjectId()
+    catalog = {product.pk: product for product in products}
+    orders = []
+    for _ in range(count):
+        lines = random.sample(products, min(items, len(products)))
+        order_items = [OrderItem(product=product.pk, quantity=random.randint(1, 3), price=product.price) for product in lines]
+        orders.append(Order(
+            id=ObjectId(),
+            user=user,
+            items=order_items,
+            total_amount=sum(item.price * item.quantity for item in order_items),
+            status="pending",
+        ))
+    return [order.dict(catalog) for order in orders]
+
+
+def timed(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func()
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def measure(name, payload, model, repeat):
+    paths = {
+        'default': lambda: JSONResponse(jsonable_encoder(payload)).body,
+        'validated': lambda: JSONResponse(model.model_validate(payload).model_dump(mode='json', exclude_unset=True)).body,
+        'fast': lambda: fast_json(payload).body,
+    }
+    results = {}
+    for path, func in paths.items():
+        seconds, body = timed(func, repeat)
+        results[path] = {'ms': round(seconds * 1000, 3), 'bytes': len(body)}
+    body = paths['fast']()
+    wire = {
+        'raw': len(body),
+        'gzip': len(gzip.compress(body, compresslevel=GZIP_LEVEL)),
+        'br': len(brotli.compress(body, quality=BROTLI_QUALITY)) if brotli else None,
+    }
+    return {'route': name, 'serialize': results, 'wire_bytes': wire}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=100, help="items on the /products page")
+    parser.add_argument('--orders', type=int, default=50)
+    parser.add_argument('--items', type=int, default=4, help="lines per order")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--inline-images', action='store_true')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    products = build_products(args.products, args.inline_images)
+    fields = ['description', 'image_url', 'updated_at']
+    page = {'items': [product.summary(fields) for product in products], 'next_cursor': 'cursor'}
+    history = build_orders(args.orders, args.items, products)
+
+    report = {
+        'orjson': orjson is not None,
+        'brotli': brotli is not None,
+        'params': vars(args),
+        'results': [
+            measure('GET /products', page, ProductPage, args.repeat),
+            # the order route declared response_model=List[dict]; a wrapper model stands in for it
+            measure('GET /orders/{user_id}', {'orders': history}, OrderHistory, args.repeat),
+        ],
+    }
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump(report, out, indent=2)
+
+    print(f"orjson: {report['orjson']}  brotli: {report['brotli']}")
+    for result in report['results']:
+        print(result['route'])
+        for path, stats in result['serialize'].items():
+            print(f"  {path:<10}{stats['ms']:>10} ms{stats['bytes']:>12} bytes")
+        wire = result['wire_bytes']
+        print(f"  wire      raw {wire['raw']}  gzip {wire['gzip']}  br {wire['br']}")
+
+
+if __name__ == '__main__':
+    main()
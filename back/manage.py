@@ -0,0 +1,108 @@
+"""Maintenance commands.
+
+    python manage.py migrate-images [--batch-size 100]
+    python manage.py ensure-indexes [--explain]
+    python manage.py snapshot-orders [--batch-size 500]
+"""
+import argparse
+from pymongo import UpdateOne
+from src.core.db_config import connect_db
+from src.models.user import Product, Order, product_cache, product_snapshot
+from src.core.storage import InvalidImage, store_data_url, image_path
+from src.core import derivatives
+from src.models.indexes import ensure_indexes, explain_hot_queries
+
+
+def migrate_images(batch_size):
+    """Move inline base64 product images into the blob store.
+
+    Walks products in _id order, so a row whose image is rejected is reported
+    and left inline instead of being picked up again by every batch.
+    """
+    migrated, skipped, last_id = 0, 0, None
+    while True:
+        query = Product.objects(image_url__startswith='data:')
+        if last_id:
+            query = query.filter(id__gt=last_id)
+        batch = list(query.only('id', 'image_url').order_by('id').limit(batch_size))
+        if not batch:
+            break
+        for product in batch:
+            try:
+                digest = store_data_url(product.image_url)
+            except InvalidImage as e:
+                skipped += 1
+                print(f"skipped product {product.id}: {e}")
+                continue
+            if derivatives.enabled():
+                derivatives.build_derivatives(digest)
+            Product.objects(id=product.id).update_one(set__image_url=image_path(digest))
+            migrated += 1
+        last_id = batch[-1].id
+        print(f"migrated {migrated} product images")
+    print(f"done: {migrated} product images moved to the blob store, {skipped} skipped")
+
+
+def snapshot_orders(batch_size):
+    """Backfill product snapshots on order lines written before checkout stored them."""
+    collection = Order._get_collection()
+    pending = {'items': {'$elemMatch': {'name': {'$exists': False}}}}
+    last_id, updated = None, 0
+    while True:
+        query = dict(pending, _id={'$gt': last_id}) if last_id else pending
+        batch = list(collection.find(query, {'items': 1}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+        products = product_cache.get_many({
+            item['product'] for order in batch for item in order['items'] if 'name' not in item
+        })
+        requests = []
+        for order in batch:
+            changes = {}
+            for index, item in enumerate(order['items']):
+                if 'name' not in item:
+                    for field, value in product_snapshot(products.get(item['product'])).items():
+                        changes[f'items.{index}.{field}'] = value
+            requests.append(UpdateOne({'_id': order['_id']}, {'$set': changes}))
+        collection.bulk_write(requests, ordered=False)
+        last_id = batch[-1]['_id']
+        updated += len(batch)
+        print(f"snapshotted {updated} orders")
+    print(f"done: {updated} orders backfilled")
+
+
+def indexes(explain):
+    """Create declared indexes and optionally show the plan for each hot query."""
+    for collection, error in ensure_indexes().items():
+        print(f"{collection}: {error or 'ok'}")
+    if explain:
+        for query, stages in explain_hot_queries().items():
+            verdict = 'COLLSCAN' if 'COLLSCAN' in stages else 'index'
+            print(f"{query}: {verdict} ({' > '.join(stages)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    images = commands.add_parser('migrate-images', help=migrate_images.__doc__)
+    images.add_argument('--batch-size', type=int, default=100)
+
+    index_command = commands.add_parser('ensure-indexes', help=indexes.__doc__)
+    index_command.add_argument('--explain', action='store_true')
+
+    orders_command = commands.add_parser('snapshot-orders', help=snapshot_orders.__doc__)
+    orders_command.add_argument('--batch-size', type=int, default=500)
+
+    args = parser.parse_args()
+    connect_db()
+    if args.command == 'migrate-images':
+        migrate_images(args.batch_size)
+    elif args.command == 'ensure-indexes':
+        indexes(args.explain)
+    elif args.command == 'snapshot-orders':
+        snapshot_orders(args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
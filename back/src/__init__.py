@@ -1,15 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.core.router import base_router
+from src.core.executor import get_executor, shutdown_executor, run_db
+from src.core import derivatives
+from src.components.payment import pipeline as payment_pipeline
+from src.core.authentication import shutdown_password_pool
+from src.core.config import ENSURE_INDEXES, COMPRESS_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY
+from src.core.instrumentation import InstrumentationMiddleware
+from src.core.responses import FastJSONResponse
+from src.core.compression import CompressionMiddleware
+from src.core.log import setup_logging, shutdown_logging
+from src.core.db_config import connect_db, disconnect_db, warm_pool
+from src.models.inventory import run_hold_sweeper
+import logging
+from src.models.indexes import ensure_indexes, ensure_required_indexes
 
-app:FastAPI = FastAPI()
+setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_db()
+    get_executor()
+    await warm_pool()
+    await run_db(ensure_required_indexes)
+    if ENSURE_INDEXES:
+        for collection, error in (await run_db(ensure_indexes)).items():
+            if error:
+                logger.error("could not build indexes", extra={"collection": collection, "error": error})
+    resumed = await run_db(payment_pipeline.resume_payments)
+    if resumed:
+        logger.info("resumed unfinished payments", extra={"payments": resumed})
+    # runs whether or not STOCK_RESERVATIONS is on, so turning it off still drains the holds left behind
+    sweeper = asyncio.create_task(run_hold_sweeper())
+    yield
+    sweeper.cancel()
+    payment_pipeline.shutdown_pool()
+    derivatives.shutdown_pool()
+    shutdown_password_pool()
+    shutdown_executor()
+    disconnect_db()
+    shutdown_logging()
+
+app:FastAPI = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['Server-Timing', 'X-Request-ID'],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES, gzip_level=GZIP_LEVEL, brotli_quality=BROTLI_QUALITY)
+app.add_middleware(InstrumentationMiddleware)
 
 app.include_router(base_router)
-
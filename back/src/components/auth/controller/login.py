@@ -1,26 +1,29 @@
 from fastapi import HTTPException
 from src.models.model import UserLogin
 from src.models.user import *
-from src.core.authentication import verify_password
+from src.models.repository import users
+from src.core.authentication import verify_password_async, create_access_token
 
 
 async def login(user_credentials:UserLogin):
     try:
-        user = User.objects(email=user_credentials.email).first()
+        user = await users.first(email=user_credentials.email)
         if not user:
             raise HTTPException(status_code=404,detail="User not Found")
-        if not verify_password(user_credentials.password,user.password):
+        if not await verify_password_async(user_credentials.password,user.password):
             raise HTTPException(status_code=400, detail="Incorrect Password")
         
-        print(user.role.roles)
+        role = await users.deref(user, 'role')
         return {
+            "access_token": create_access_token(str(user.id), role.roles),
+            "token_type": "bearer",
             "id":str(user.id),
             "email":user.email,
             "first_name":user.first_name,
             'last_name':user.last_name,
             "role": {
-                "id": str(user.role.id),
-                "name": user.role.roles
+                "id": str(role.id),
+                "name": role.roles
             }
         }
     except Exception as e:
@@ -1,32 +1,36 @@
 from fastapi import HTTPException
 from src.models.model import UserCreate
 from src.models.user import *
-from src.core.authentication import hash_password
+from src.models.repository import users, roles
+from src.core.authentication import hash_password_async
 from bson import ObjectId
-from mongoengine.errors import DoesNotExist, ValidationError
+from mongoengine.errors import DoesNotExist, ValidationError, NotUniqueError
 
 async def create_user(user: UserCreate):
     try:
-        if User.objects(email=user.email).first():
+        if await users.first(email=user.email):
             raise HTTPException(status_code=400, detail="Email already registered")
 
+        password = await hash_password_async(user.password)
         role = None
         if user.role_id:
             try:
-                role = Role.objects.get(id=ObjectId(user.role_id))
+                role = await roles.get(id=ObjectId(user.role_id))
             except (DoesNotExist, ValidationError):
                 raise HTTPException(status_code=404, detail="Specified role not found")
         else:
-            role = Role(roles=['user']).save()
+            role = await roles.create(roles=['user'])
 
         try:
-            new_user = User(
+            new_user = await users.create(
                 email=user.email,
                 first_name=user.first_name,
                 last_name=user.last_name,
-                password=hash_password(user.password),
+                password=password,
                 role=role
-            ).save()
+            )
+        except NotUniqueError:
+            raise HTTPException(status_code=400, detail="Email already registered")
         except ValidationError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
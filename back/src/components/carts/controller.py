@@ -1,158 +1,162 @@
 from src.models.model import CartItemCreate
-from src.models.user import User,Product,Cart,CartItem
+from src.models.user import Product,Cart,ref_id,load_products,raw_items,product_cache
 from bson import ObjectId
-from fastapi import HTTPException
+from fastapi import HTTPException, Depends
 from datetime import datetime
+from src.core.executor import run_db
+from src.core.responses import fast_json
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.models.repository import carts
+from src.core.authentication import current_user_id, ensure_same_user
+from src.core.config import STOCK_RESERVATIONS
+from src.models.inventory import OutOfStock, hold_stock, undo_hold, release_hold
+import logging
 
-async def add_to_cart(user_id: str, cart_item: CartItemCreate):
+logger = logging.getLogger(__name__)
+
+async def add_to_cart(user_id: str, cart_item: CartItemCreate, current_user: str = Depends(current_user_id)):
     try:
-        print(f"Adding to cart - User: {user_id}, Product: {cart_item.product_id}, Quantity: {cart_item.quantity}")
         if not user_id or len(user_id) != 24:
             raise HTTPException(status_code=400, detail="Invalid user ID format")
+        ensure_same_user(user_id, current_user)
             
         if not cart_item.product_id or len(cart_item.product_id) != 24:
             raise HTTPException(status_code=400, detail="Invalid product ID format")
             
         if cart_item.quantity <= 0:
             raise HTTPException(status_code=400, detail="Quantity must be greater than 0")
-        user = User.objects(id=ObjectId(user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        product = Product.objects(id=ObjectId(cart_item.product_id)).first()
+        user = ObjectId(user_id)
+        product = await run_db(product_cache.get, ObjectId(cart_item.product_id))
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         if product.stock < cart_item.quantity:
             raise HTTPException(status_code=400, detail=f"Not enough stock available. Only {product.stock} items left")
-        cart = Cart.objects(user=user).first()
-        if not cart:
-            cart = Cart(user=user, items=[]).save()
-            print(f"Created new cart for user {user_id}")
-        item_updated = False
-        cleaned_items = []
-        
-        for item in cart.items:
-            try:
-                if item.product and str(item.product.id) == cart_item.product_id:
-                    new_quantity = item.quantity + cart_item.quantity
-                    if product.stock < new_quantity:
-                        raise HTTPException(status_code=400, detail=f"Not enough stock. You have {item.quantity} in cart, only {product.stock} available")
-                    
-                    item.quantity = new_quantity
-                    item_updated = True
-                    print(f"Updated existing cart item quantity to {new_quantity}")
-                
-                cleaned_items.append(item)
-                
-            except Exception as ref_error:
-                print(f"Found broken product reference, removing: {ref_error}")
-                continue
-        cart.items = cleaned_items
-        if not item_updated:
-            new_item = CartItem(product=product, quantity=cart_item.quantity)
-            cart.items.append(new_item)
-            print(f"Added new item to cart")
-        cart.updated_at = datetime.now()
-        cart.save()
-        cart_dict = cart.dict()
-        print(f"Cart updated successfully: {len(cart_dict.get('items', []))} items")
+        if STOCK_RESERVATIONS:
+            cart = await run_db(_hold_and_add_line, user, product, cart_item.quantity)
+        else:
+            cart = await run_db(_add_line, user, product, cart_item.quantity)
+        cart_dict = await carts.serialize(cart)
+        logger.debug("cart updated", extra={"user_id": user_id, "product_id": cart_item.product_id, "quantity": cart_item.quantity, "items": len(cart_dict['items'])})
         return cart_dict
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in add_to_cart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("add_to_cart failed")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-async def get_cart(user_id: str):
+def _hold_and_add_line(user, product, quantity):
+    """Reservation mode: take the units out of stock for this cart first, then add the line."""
+    try:
+        hold_stock(user, product.pk, quantity)
+    except OutOfStock:
+        product_cache.invalidate(product.pk)
+        raise HTTPException(status_code=400, detail=f"Not enough stock available for {product.name}")
+    try:
+        # the hold already guarantees the units, so the line is not limited by stock
+        return _add_line(user, product, quantity, limit=False)
+    except Exception:
+        undo_hold(user, product.pk, quantity)
+        raise
+
+def _add_line(user, product, quantity, limit=True):
+    """Add quantity of product to the user's cart in one atomic update and return the cart.
+
+    An existing line is bumped with $inc only while the new total still fits in
+    stock; otherwise a new line is $pushed, upserting the cart. When the push
+    filter misses because the line appeared meanwhile, the unique carts.user
+    index rejects the upsert and the increment is tried again.
+    """
+    collection = Cart._get_collection()
+    now = datetime.now()
+    line = {'product': product.pk}
+    if limit:
+        line['quantity'] = {'$lte': product.stock - quantity}
+    for _ in range(2):
+        cart = collection.find_one_and_update(
+            {'user': user, 'items': {'$elemMatch': line}},
+            {'$inc': {'items.$.quantity': quantity}, '$set': {'updated_at': now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if cart:
+            return Cart._from_son(cart)
+        try:
+            cart = collection.find_one_and_update(
+                {'user': user, 'items.product': {'$ne': product.pk}},
+                {
+                    '$push': {'items': {'product': product.pk, 'quantity': quantity}},
+                    '$set': {'updated_at': now},
+                    '$setOnInsert': {'created_at': now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return Cart._from_son(cart)
+        except DuplicateKeyError:
+            continue
+    in_cart = next((item['quantity'] for item in (collection.find_one({'user': user}) or {}).get('items', []) if item['product'] == product.pk), 0)
+    raise HTTPException(status_code=400, detail=f"Not enough stock. You have {in_cart} in cart, only {product.stock} available")
+
+async def get_cart(user_id: str, current_user: str = Depends(current_user_id)):
     try:
-        print(f"Getting cart for user: {user_id}")
         if not user_id or len(user_id) != 24:
             raise HTTPException(status_code=400, detail="Invalid user ID format")
-        user = User.objects(id=ObjectId(user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        ensure_same_user(user_id, current_user)
+        user = ObjectId(user_id)
             
-        cart = Cart.objects(user=user).first()
+        cart = await carts.first(user=user)
         if not cart:
-            print(f"No cart found for user {user_id}, returning empty cart")
-            return {
+            return fast_json({
                 "id": None,
                 "user": user_id,
                 "items": []
-            }
-        cleaned_items = []
-        items_removed = 0
-        
-        for item in cart.items:
-            try:
-                if item.product and item.product.id:
-                    test_dict = item.dict()
-                    cleaned_items.append(item)
-                else:
-                    items_removed += 1
-            except Exception as ref_error:
-                print(f"Removing broken cart item reference: {ref_error}")
-                items_removed += 1
-                continue
-        if items_removed > 0:
+            })
+        cleaned_items, broken_ids, cart_products = await run_db(_drop_broken_items, cart)
+        if broken_ids:
             cart.items = cleaned_items
-            cart.save()
-            print(f"Removed {items_removed} broken references from cart")
+            await carts.update(cart, __raw__={'$pull': {'items': {'product': {'$in': broken_ids}}}})
+            logger.info("removed broken cart references", extra={"user_id": user_id, "product_ids": [str(pk) for pk in broken_ids]})
         
-        cart_dict = cart.dict()
-        print(f"Retrieved cart with {len(cart_dict.get('items', []))} items")
-        return cart_dict
+        return fast_json(await carts.serialize(cart, cart_products))
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in get_cart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("get_cart failed")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-async def remove_from_cart(user_id: str, product_id: str):
+def _drop_broken_items(cart):
+    products = load_products(raw_items(cart))
+    cleaned_items = [item for item in raw_items(cart) if ref_id(item, 'product') in products]
+    broken_ids = [ref_id(item, 'product') for item in raw_items(cart) if ref_id(item, 'product') not in products]
+    return cleaned_items, broken_ids, products
+
+async def remove_from_cart(user_id: str, product_id: str, current_user: str = Depends(current_user_id)):
     try:
         if not user_id or len(user_id) != 24:
             raise HTTPException(status_code=400, detail="Invalid user ID format")
+        ensure_same_user(user_id, current_user)
         if not product_id or len(product_id) != 24:
             raise HTTPException(status_code=400, detail="Invalid product ID format")
-        user = User.objects(id=ObjectId(user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        cart = Cart.objects(user=user).first()
-        if not cart:
-            raise HTTPException(status_code=404, detail="Cart not found")
-        item_found = False
-        cleaned_items = []
-        
-        for item in cart.items:
-            try:
-                if item.product and str(item.product.id) == product_id:
-                    item_found = True
-                    print(f"Found and removing item with product {product_id}")
-                    continue
-                else:
-                    cleaned_items.append(item)
-            except Exception as ref_error:
-                print(f"Removing broken reference during cleanup: {ref_error}")
-                continue
-        
-        if not item_found:
+        user = ObjectId(user_id)
+        result = await run_db(
+            Cart._get_collection().update_one,
+            {'user': user, 'items.product': ObjectId(product_id)},
+            {'$pull': {'items': {'product': ObjectId(product_id)}}, '$set': {'updated_at': datetime.now()}},
+        )
+        if STOCK_RESERVATIONS:
+            # a hold without its cart line is never converted; give the units back either way
+            await run_db(release_hold, user, ObjectId(product_id))
+        if not result.matched_count:
+            if not await carts.first(user=user):
+                raise HTTPException(status_code=404, detail="Cart not found")
             raise HTTPException(status_code=404, detail='Product not found in cart')
         
-        cart.items = cleaned_items
-        cart.updated_at = datetime.now()
-        cart.save()
-        
         return {"message": "Item removed from cart"}
                 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in remove_from_cart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("remove_from_cart failed")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,50 @@
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from src.components.images.interface import ImageUpload
+from src.core.storage import InvalidImage, store_data_url, find_blob, image_url
+from src.core import derivatives
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# blobs share the API's origin; never let a browser treat one as a document
+BLOB_HEADERS = {"X-Content-Type-Options": "nosniff", "Content-Security-Policy": "default-src 'none'; sandbox"}
+
+async def upload_image(image:ImageUpload):
+    try:
+        digest = await run_in_threadpool(store_data_url, image.data_url)
+        derivatives.schedule(digest)
+        return {"hash": digest, "url": image_url(digest), "images": derivatives.variant_urls(image_url(digest))}
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+async def get_image(image_hash:str, request:Request):
+    blob = await run_in_threadpool(find_blob, image_hash)
+    if not blob:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path, content_type = blob
+    etag = f'"{image_hash}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, **BLOB_HEADERS}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+async def get_image_variant(image_hash:str, variant:str, request:Request):
+    name, _, extension = variant.partition('.')
+    if name not in derivatives.VARIANTS or (extension and extension not in derivatives.FORMATS):
+        raise HTTPException(status_code=404, detail="Unknown image variant")
+    if not derivatives.enabled():
+        return await get_image(image_hash, request)
+    if not await run_in_threadpool(find_blob, image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not extension:
+        extension = 'webp' if 'image/webp' in request.headers.get('accept', '') else 'jpg'
+    path = await derivatives.ensure_variant(image_hash, name, extension)
+    if path is None:
+        return await get_image(image_hash, request)
+    etag = f'"{image_hash}-{name}.{extension}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Vary": "Accept", **BLOB_HEADERS}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=derivatives.FORMATS[extension][1], headers=headers)
@@ -0,0 +1,4 @@
+from pydantic import BaseModel
+
+class ImageUpload(BaseModel):
+    data_url: str
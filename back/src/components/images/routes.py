@@ -0,0 +1,7 @@
+from src.core.router import base_router
+from src.components.images.controller import upload_image, get_image, get_image_variant
+
+base_router.add_api_route('/images',upload_image,methods=['POST'],response_model=dict)
+base_router.add_api_route('/images/{image_hash}',get_image,methods=['GET'])
+
+base_router.add_api_route('/images/{image_hash}/{variant}',get_image_variant,methods=['GET'])
\ No newline at end of file
@@ -0,0 +1,16 @@
+from fastapi.responses import PlainTextResponse
+from src.core.instrumentation import render_metrics, format_labels
+from src.models.user import product_cache
+
+def _samples(prefix:str, values:dict, labels:dict = None) -> list:
+    lines = []
+    for name, value in values.items():
+        metric = f"{prefix}_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric}{format_labels(labels or {})} {value}"]
+    return lines
+
+async def get_metrics():
+    """Prometheus text exposition of request, Mongo, password pool and cache metrics."""
+    lines = render_metrics()
+    lines += _samples('document_cache', dict(product_cache.stats), labels={'collection': 'product'})
+    return PlainTextResponse('\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4')
@@ -0,0 +1,4 @@
+from src.core.router import base_router
+from src.components.metrics.controller import get_metrics
+
+base_router.add_api_route('/metrics',get_metrics,methods=['GET'],include_in_schema=False)
@@ -1,64 +1,223 @@
 from src.models.model import OrderCreate
-from src.models.user import Cart,OrderItem,Order,User
+from src.models.user import Cart,OrderItem,Order,ref_id,load_products,raw_items
 from bson import ObjectId
-from fastapi import HTTPException
+from bson.errors import InvalidId
+import base64
+from datetime import datetime
+from typing import Literal
+from fastapi import HTTPException, Depends, Query, Request
+from src.core.executor import run_db
+from src.core.responses import fast_json
+from src.models.repository import carts, orders
+from src.core.authentication import current_user_id, ensure_same_user
+from src.models.inventory import OutOfStock, reserve_stock, release_stock, held_quantities, convert_holds
+from src.core.config import STOCK_RESERVATIONS
+from src.models.idempotency import idempotent
+import logging
 
-async def create_order(order_data:OrderCreate):
+logger = logging.getLogger(__name__)
+
+async def create_order(request:Request, order_data:OrderCreate, current_user:str = Depends(current_user_id)):
+    return await idempotent(request, current_user, 'orders', order_data.model_dump_json(), lambda: _create_order(order_data, current_user))
+
+async def _create_order(order_data:OrderCreate, current_user:str):
     try:
-        cart = Cart.objects(id=ObjectId(order_data.cart_id)).first()
-        if not cart or not cart.items:
+        try:
+            cart_id = ObjectId(order_data.cart_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cart ID format")
+        cart = await carts.first(id=cart_id)
+        if not cart or not raw_items(cart):
             raise HTTPException(status_code=400, detail="Cart is empty or not found")
-        total_amount = 0
-        order_items = []
+        ensure_same_user(str(ref_id(cart, 'user')), current_user)
+        user = ref_id(cart, 'user')
+        held = await run_db(held_quantities, user, [ref_id(item, 'product') for item in raw_items(cart)]) if STOCK_RESERVATIONS else {}
+        order_items, total_amount, order_products = await run_db(_price_items, cart, held)
+        quantities = {}
+        for item in order_items:
+            product_id = ref_id(item, 'product')
+            quantities[product_id] = quantities.get(product_id, 0) + item.quantity
 
-        for cart_item in cart.items:
-            product = cart_item.product
-            if product.stock < cart_item.quantity:
-                raise HTTPException(status_code=400,detail=f"not enough stock for {product.name}")
-            
-            order_item = OrderItem(
-                product = product,
-                quantity = cart_item.quantity,
-                price = product.price
+        try:
+            await run_db(_take_stock, user, quantities, held)
+        except OutOfStock as e:
+            raise HTTPException(status_code=400,detail=f"not enough stock for {order_products[e.product_id].name}")
+        try:
+            order = await orders.create(
+                user=user,
+                items=order_items,
+                total_amount=total_amount
             )
-            order_items.append(order_item)
-            product.stock -= cart_item.quantity
-            product.save()
-            total_amount += product.price*cart_item.quantity
-        
-        order = Order(
-            user=cart.user,
-            items=order_items,
-            total_amount=total_amount
-        ).save()
-        cart.items = []
-        cart.save()
-        return order.dict()
+            cart.items = []
+            await carts.save(cart)
+        except Exception:
+            await run_db(release_stock, quantities)
+            raise
+        return await orders.serialize(order, order_products)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400,detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _take_stock(user, quantities, held):
+    """Take an order's stock; in reservation mode the cart's holds cover what they still can.
+
+    Units beyond the holds are reserved first with the usual stock check, so a
+    shortfall fails before any hold is spent. Held units are then converted
+    without one. A hold that lapsed in between is made up from stock too.
+    """
+    if not STOCK_RESERVATIONS:
+        reserve_stock(quantities)
+        return
+    shortfall = {product_id: quantity - held.get(product_id, 0) for product_id, quantity in quantities.items() if quantity > held.get(product_id, 0)}
+    reserve_stock(shortfall)
+    converted = convert_holds(user, {product_id: quantity - shortfall.get(product_id, 0) for product_id, quantity in quantities.items() if quantity > shortfall.get(product_id, 0)})
+    lapsed = {
+        product_id: quantity - shortfall.get(product_id, 0) - converted.get(product_id, 0)
+        for product_id, quantity in quantities.items()
+        if quantity > shortfall.get(product_id, 0) + converted.get(product_id, 0)
+    }
+    try:
+        reserve_stock(lapsed)
+    except OutOfStock:
+        release_stock({product_id: quantity - lapsed.get(product_id, 0) for product_id, quantity in quantities.items()})
+        raise
+
+def _price_items(cart, held=None):
+    held = held or {}
+    products = load_products(raw_items(cart))
+    total_amount = 0
+    order_items = []
+
+    for cart_item in raw_items(cart):
+        product = products.get(ref_id(cart_item, 'product'))
+        if not product:
+            raise HTTPException(status_code=400,detail="A product in the cart is no longer available")
+        if product.stock + held.get(product.pk, 0) < cart_item.quantity:
+            raise HTTPException(status_code=400,detail=f"not enough stock for {product.name}")
+        
+        order_items.append(OrderItem.snapshot(product, cart_item.quantity))
+        total_amount += product.price*cart_item.quantity
+    return order_items, total_amount, products
+
+def encode_cursor(created_at, order_id)-> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{order_id}".encode()).decode()
 
-async def get_user_order(user_id:str):
+def decode_cursor(cursor:str):
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), ObjectId(order_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _order_page(user_id, limit, cursor, view):
+    """One page of a user's orders, newest first, keyset on (created_at, _id)."""
+    match = {'user': user_id}
+    if cursor:
+        created_at, order_id = cursor
+        match['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': order_id}},
+        ]
+    if view == 'summary':
+        pipeline = [
+            {'$match': match},
+            {'$sort': {'created_at': -1, '_id': -1}},
+            {'$limit': limit + 1},
+            {'$project': {
+                'total_amount': 1,
+                'status': 1,
+                'created_at': 1,
+                'item_count': {'$size': {'$ifNull': ['$items', []]}},
+            }},
+        ]
+        rows = list(Order._get_collection().aggregate(pipeline))
+        page = [
+            {
+                'id': str(row['_id']),
+                'total_amount': row['total_amount'],
+                'status': row['status'],
+                'item_count': row['item_count'],
+                'created_at': row.get('created_at'),
+            }
+            for row in rows[:limit]
+        ]
+        last = rows[limit - 1] if len(rows) > limit else None
+        next_cursor = encode_cursor(last['created_at'], last['_id']) if last else None
+        return {"items": page, "next_cursor": next_cursor}
+
+    user_orders = list(Order.objects(__raw__=match).order_by('-created_at', '-id').limit(limit + 1))
+    # only lines from before checkout snapshots need their products; backfilled history needs none
+    products = load_products([item for order in user_orders[:limit] for item in raw_items(order) if not item.has_snapshot])
+    orders_list = []
+    for order in user_orders[:limit]:
+        try:
+            orders_list.append(order.dict(products))
+        except Exception as dict_error:
+            logger.warning("skipping order that could not be serialized", extra={"order_id": str(order.pk), "error": str(dict_error)})
+            continue
+    last = user_orders[limit - 1] if len(user_orders) > limit else None
+    return {"items": orders_list, "next_cursor": encode_cursor(last.created_at, last.pk) if last else None}
+
+async def get_user_order(
+    user_id:str,
+    current_user:str = Depends(current_user_id),
+    limit:int = Query(20, ge=1, le=100),
+    cursor:str | None = None,
+    view:Literal['summary', 'full'] = 'summary',
+):
+    """A page of the user's orders; `summary` leaves out the lines and reports item_count instead."""
     try:
         if not user_id or len(user_id) != 24:
             raise HTTPException(status_code=400, detail="Invalid user ID format")
             
-        user = User.objects(id=ObjectId(user_id)).first()
-        if not user:
-            raise HTTPException(status_code=404,detail="User not found")
+        ensure_same_user(user_id, current_user)
+        position = decode_cursor(cursor) if cursor else None
             
-        orders = Order.objects(user=user)
-        orders_list = []
-        for order in orders:
-            try:
-                orders_list.append(order.dict())
-            except Exception as dict_error:
-                print(f"Error converting order to dict: {dict_error}")
-                continue
-                
-        return orders_list
+        return fast_json(await run_db(_order_page, ObjectId(user_id), limit, position, view))
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_user_order: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        logger.exception("get_user_order failed")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+async def get_order_detail(user_id:str, order_id:str, current_user:str = Depends(current_user_id)):
+    try:
+        if not user_id or len(user_id) != 24 or not order_id or len(order_id) != 24:
+            raise HTTPException(status_code=400, detail="Invalid ID format")
+        ensure_same_user(user_id, current_user)
+        order = await orders.first(id=ObjectId(order_id), user=ObjectId(user_id))
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return fast_json(await orders.serialize(order))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("get_order_detail failed")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def _order_stats(user_id):
+    rows = Order._get_collection().aggregate([
+        {'$match': {'user': user_id}},
+        {'$group': {'_id': '$status', 'count': {'$sum': 1}, 'total': {'$sum': '$total_amount'}}},
+    ])
+    statuses = {row['_id']: {'count': row['count'], 'total': row['total']} for row in rows}
+    return {
+        "count": sum(status['count'] for status in statuses.values()),
+        "total": sum(status['total'] for status in statuses.values()),
+        "statuses": statuses,
+    }
+
+async def get_order_stats(user_id:str, current_user:str = Depends(current_user_id)):
+    """Order count and amount per status, from one $group over the user's orders."""
+    try:
+        if not user_id or len(user_id) != 24:
+            raise HTTPException(status_code=400, detail="Invalid user ID format")
+        ensure_same_user(user_id, current_user)
+        return fast_json(await run_db(_order_stats, ObjectId(user_id)))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("get_order_stats failed")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,6 +1,7 @@
 from src.components.order.controller import *
 from src.core.router import base_router
-from typing import List
 
 base_router.add_api_route('/orders',create_order,response_model=dict,methods=["POST"])
-base_router.add_api_route('/orders/{user_id}',get_user_order,response_model=List[dict],methods=["GET"])
\ No newline at end of file
+base_router.add_api_route('/orders/{user_id}',get_user_order,methods=["GET"])
+base_router.add_api_route('/orders/{user_id}/stats',get_order_stats,methods=["GET"])
+base_router.add_api_route('/orders/{user_id}/{order_id}',get_order_detail,methods=["GET"])
\ No newline at end of file
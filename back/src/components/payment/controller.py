@@ -1,22 +1,117 @@
 from src.components.payment.interface import PaymentCreate
-from src.models.user import Order,Payment
+from src.components.payment import pipeline
+from src.models.user import Order,ref_id
+from src.models.repository import orders, payments
 from bson import ObjectId
-from fastapi import HTTPException
+from bson.errors import InvalidId
+from mongoengine import ValidationError
+import asyncio
+import time
+from datetime import datetime
+from fastapi import HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from src.core.authentication import current_user_id, ensure_same_user
+from src.core.config import PAYMENT_EVENTS_TIMEOUT_SECONDS
+from src.core.executor import run_db
+from src.core.responses import fast_json, dumps
+from src.models.idempotency import idempotent
 
-async def process_payment(payment_data:PaymentCreate):
+async def process_payment(request:Request, payment_data:PaymentCreate, current_user:str = Depends(current_user_id)):
+    return await idempotent(request, current_user, 'payment', payment_data.model_dump_json(), lambda: _process_payment(payment_data, current_user))
+
+def _start_payment(order_id):
+    """pending -> payment_processing, so one order never has two payments running."""
+    return Order.objects(pk=order_id, status="pending").update_one(set__status="payment_processing", set__updated_at=datetime.now())
+
+async def _process_payment(payment_data:PaymentCreate, current_user:str):
+    """Accept the payment and hand it to the payment pool; the charge itself happens after the 202."""
     try:
-        order = Order.objects(id=ObjectId(payment_data.order_id)).first()
+        try:
+            order_id = ObjectId(payment_data.order_id)
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid order ID format")
+        order = await orders.first(id=order_id)
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
-        payment = Payment(
-            order=order,
-            amount=order.total_amount,
-            payment_method=payment_data.payment_method
-        ).save()
-
-        order.status = "paid"
-        order.save()
-        return payment.dict()
+        ensure_same_user(str(ref_id(order, 'user')), current_user)
+        if not await run_db(_start_payment, order.pk):
+            raise HTTPException(status_code=409, detail="Order is already paid or has a payment in progress")
+        try:
+            payment = await payments.create(
+                order=order,
+                user=ref_id(order, 'user'),
+                amount=order.total_amount,
+                payment_method=payment_data.payment_method
+            )
+        except ValidationError as e:
+            await run_db(lambda: Order.objects(pk=order.pk, status="payment_processing").update_one(set__status="pending"))
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception:
+            await run_db(lambda: Order.objects(pk=order.pk, status="payment_processing").update_one(set__status="pending"))
+            raise
+        pipeline.submit(payment.pk)
+        return fast_json(payment.dict(), status_code=202, headers={"Location": f"/payment/{payment.pk}"})
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400,detail=str(e))
-    
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+async def _load_payment(payment_id:str, current_user:str):
+    try:
+        payment = await payments.first(id=ObjectId(payment_id))
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid payment ID format")
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    # payments from before the pipeline have no user; their order has it
+    owner = ref_id(payment, 'user') or ref_id(await payments.deref(payment, 'order'), 'user')
+    ensure_same_user(str(owner), current_user)
+    return payment
+
+async def get_payment(payment_id:str, current_user:str = Depends(current_user_id)):
+    try:
+        payment = await _load_payment(payment_id, current_user)
+        return fast_json(payment.dict(), headers={"Cache-Control": "no-store"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+async def payment_events(payment_id:str, current_user:str = Depends(current_user_id)):
+    """Server-sent events: the payment as it is now, then every status change until it finishes.
+
+    Changes made in this process wake the stream at once; the database is
+    also re-read every couple of seconds in case another worker charges it.
+    """
+    payment = await _load_payment(payment_id, current_user)
+
+    async def stream():
+        event = pipeline.subscribe(payment.pk)
+        try:
+            deadline = time.monotonic() + PAYMENT_EVENTS_TIMEOUT_SECONDS
+            current, last_status = payment, None
+            while True:
+                if current.status != last_status:
+                    last_status = current.status
+                    yield b"event: status\ndata: " + dumps(current.dict()) + b"\n\n"
+                if last_status in pipeline.TERMINAL:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    yield b"event: timeout\ndata: {}\n\n"
+                    return
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(2.0, remaining))
+                except asyncio.TimeoutError:
+                    # keeps proxies from closing an idle stream
+                    yield b": keep-alive\n\n"
+                event.clear()
+                current = await payments.first(id=payment.pk)
+        finally:
+            pipeline.unsubscribe(payment.pk, event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
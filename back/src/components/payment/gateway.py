@@ -0,0 +1,54 @@
+import importlib
+import time
+import uuid
+from src.core.config import PAYMENT_GATEWAY, PAYMENT_STUB_LATENCY_SECONDS, PAYMENT_STUB_DECLINE
+
+
+class PaymentDeclined(Exception):
+    """The gateway answered and refused the charge; retrying the same charge will not help."""
+
+
+class PaymentGateway:
+    """What the payment pipeline needs from a payment provider.
+
+    charge() runs on a payment worker thread, so it may block on network
+    calls. `reference` is the payment id and is stable across retries of the
+    same payment; pass it as the provider's idempotency key so a payment that
+    is picked up again after a crash is not charged twice. Return the
+    provider's transaction id, raise PaymentDeclined for a refusal and anything
+    else for a failure to get an answer.
+    """
+
+    def charge(self, reference:str, amount:float, payment_method:str) -> str:
+        raise NotImplementedError
+
+
+class StubGateway(PaymentGateway):
+    """Local stand-in: waits like a network call, approves everything but the configured methods."""
+
+    def __init__(self, latency:float = PAYMENT_STUB_LATENCY_SECONDS, declined_methods:str = PAYMENT_STUB_DECLINE):
+        self.latency = latency
+        self.declined_methods = {method.strip() for method in declined_methods.split(',') if method.strip()}
+        self._charges = {}
+
+    def charge(self, reference, amount, payment_method):
+        if reference in self._charges:
+            return self._charges[reference]
+        time.sleep(self.latency)
+        if payment_method in self.declined_methods or amount <= 0:
+            raise PaymentDeclined("The payment was declined")
+        self._charges[reference] = transaction = f"stub_{uuid.uuid4().hex}"
+        return transaction
+
+
+_gateway: PaymentGateway | None = None
+
+def get_gateway() -> PaymentGateway:
+    global _gateway
+    if _gateway is None:
+        if PAYMENT_GATEWAY == 'stub':
+            _gateway = StubGateway()
+        else:
+            module, _, name = PAYMENT_GATEWAY.partition(':')
+            _gateway = getattr(importlib.import_module(module), name)()
+    return _gateway
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from src.core.config import PAYMENT_WORKERS, PAYMENT_STALL_SECONDS, PAYMENT_MAX_ATTEMPTS
+from src.components.payment.gateway import PaymentDeclined, get_gateway
+from src.models.user import Order, Payment
+
+logger = logging.getLogger(__name__)
+
+TERMINAL = ('completed', 'failed')
+
+# gateway calls block on the network, so they run here and never on the db executor or the event loop
+_pool: ThreadPoolExecutor | None = None
+# payment id -> {(loop, event)} for status streams waiting in this process
+_watchers: dict[str, set] = {}
+_watchers_lock = threading.Lock()
+
+def get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=PAYMENT_WORKERS, thread_name_prefix="payment")
+    return _pool
+
+def shutdown_pool():
+    """Let in-flight charges finish; queued payments stay 'pending' and are resumed on the next start."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+def submit(payment_id):
+    get_pool().submit(process_payment, payment_id)
+
+def subscribe(payment_id) -> asyncio.Event:
+    event = asyncio.Event()
+    with _watchers_lock:
+        _watchers.setdefault(str(payment_id), set()).add((asyncio.get_running_loop(), event))
+    return event
+
+def unsubscribe(payment_id, event):
+    with _watchers_lock:
+        watchers = _watchers.get(str(payment_id), set())
+        watchers.difference_update({watcher for watcher in watchers if watcher[1] is event})
+        if not watchers:
+            _watchers.pop(str(payment_id), None)
+
+def _notify(payment_id):
+    with _watchers_lock:
+        watchers = list(_watchers.get(str(payment_id), ()))
+    for loop, event in watchers:
+        loop.call_soon_threadsafe(event.set)
+
+def _claim(payment_id):
+    """pending -> processing, or take over a payment whose worker stalled. None if someone else owns it."""
+    now = datetime.now()
+    stalled = now - timedelta(seconds=PAYMENT_STALL_SECONDS)
+    return Payment._get_collection().find_one_and_update(
+        {'_id': payment_id, '$or': [{'status': 'pending'}, {'status': 'processing', 'updated_at': {'$lt': stalled}}]},
+        {'$set': {'status': 'processing', 'updated_at': now}, '$inc': {'attempts': 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+def _settle_order(order_id, payment_status):
+    Order._get_collection().update_one(
+        {'_id': order_id, 'status': 'payment_processing'},
+        {'$set': {'status': 'paid' if payment_status == 'completed' else 'pending', 'updated_at': datetime.now()}},
+    )
+
+def _finish(payment, status, **fields):
+    """processing -> status, only for the attempt that claimed it; the order follows the payment."""
+    result = Payment._get_collection().update_one(
+        {'_id': payment['_id'], 'status': 'processing', 'attempts': payment['attempts']},
+        {'$set': {'status': status, 'updated_at': datetime.now(), **fields}},
+    )
+    if result.modified_count == 1:
+        _settle_order(payment['order'], status)
+
+def _retry_later(payment, delay):
+    Payment._get_collection().update_one(
+        {'_id': payment['_id'], 'status': 'processing', 'attempts': payment['attempts']},
+        {'$set': {'status': 'pending', 'updated_at': datetime.now()}},
+    )
+    timer = threading.Timer(delay, submit, args=(payment['_id'],))
+    timer.daemon = True
+    timer.start()
+
+def process_payment(payment_id):
+    """Charge one payment through the gateway. Runs on the payment pool."""
+    try:
+        payment = _claim(payment_id)
+        if payment is None:
+            return
+        _notify(payment_id)
+        try:
+            reference = get_gateway().charge(str(payment_id), payment['amount'], payment['payment_method'])
+        except PaymentDeclined as e:
+            _finish(payment, 'failed', failure_reason=str(e))
+        except Exception:
+            logger.warning("payment gateway call failed", exc_info=True, extra={"payment_id": str(payment_id), "attempt": payment['attempts']})
+            if payment['attempts'] >= PAYMENT_MAX_ATTEMPTS:
+                _finish(payment, 'failed', failure_reason="payment provider unavailable")
+            else:
+                _retry_later(payment, 2 ** payment['attempts'])
+        else:
+            _finish(payment, 'completed', gateway_reference=reference)
+    except Exception:
+        logger.exception("payment processing failed", extra={"payment_id": str(payment_id)})
+    finally:
+        _notify(payment_id)
+
+def resume_payments():
+    """Requeue payments a previous process accepted but never finished, and settle orphaned orders.
+
+    Payment and order are separate writes, so a crash between them can leave
+    an order 'payment_processing' behind a finished payment. Claims are
+    conditional, so several workers running this at once charge nothing twice.
+    """
+    stalled = datetime.now() - timedelta(seconds=PAYMENT_STALL_SECONDS)
+    payments = Payment._get_collection()
+    unfinished = payments.find(
+        {'$or': [{'status': 'pending'}, {'status': 'processing', 'updated_at': {'$lt': stalled}}]},
+        {'_id': 1},
+    )
+    resumed = 0
+    for payment in unfinished:
+        submit(payment['_id'])
+        resumed += 1
+    for order in Order._get_collection().find({'status': 'payment_processing', 'updated_at': {'$lt': stalled}}, {'_id': 1}):
+        latest = payments.find_one({'order': order['_id']}, {'status': 1}, sort=[('created_at', -1)])
+        if latest is None or latest['status'] in TERMINAL:
+            _settle_order(order['_id'], latest['status'] if latest else 'failed')
+    return resumed
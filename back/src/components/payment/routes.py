@@ -1,4 +1,6 @@
 from src.core.router import base_router
-from src.components.payment.controller import process_payment
+from src.components.payment.controller import process_payment, get_payment, payment_events
 
-base_router.add_api_route('/payment',process_payment,methods=['POST'],response_model=dict)
\ No newline at end of file
+base_router.add_api_route('/payment',process_payment,methods=['POST'],response_model=dict,status_code=202)
+base_router.add_api_route('/payment/{payment_id}',get_payment,methods=['GET'])
+base_router.add_api_route('/payment/{payment_id}/events',payment_events,methods=['GET'])
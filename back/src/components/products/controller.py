@@ -1,37 +1,276 @@
-from fastapi import HTTPException
-from mongoengine import DoesNotExist
+import asyncio
+import base64
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import HTTPException, Query, Request, Response
+from mongoengine import DoesNotExist, Q
 from bson import ObjectId
-from datetime import datetime
-from src.models.user import Product
+from datetime import datetime, timezone
+from src.models.user import Product, product_cache, product_names
+from src.core.executor import run_db
 from src.models.model import ProductCreate,ProductUpdate
+from src.models.repository import products
+from src.core.storage import InvalidImage, is_data_url, store_data_url, image_path, stored_image
+from src.core import derivatives
+from starlette.concurrency import run_in_threadpool
+from src.core.responses import fast_json
+from src.core.config import SEARCH_MAX_PAGE, PRICE_BUCKETS, PRODUCT_CACHE_CONTROL
+from typing import Literal
 
 
+async def externalize_image(value:str)-> str:
+    # inline data URLs are moved to the blob store so product documents stay small
+    if not is_data_url(value):
+        return stored_image(value)
+    try:
+        digest = await run_in_threadpool(store_data_url, value)
+        derivatives.schedule(digest)
+        return image_path(digest)
+    except InvalidImage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 async def create_product(product:ProductCreate):
     try:
-        new_product = Product(
+        new_product = await products.create(
             name = product.name,
             description = product.description,
             price=product.price,
-            image_url = product.image_url,
-            stock=product.stock
-        ).save()
+            image_url = await externalize_image(product.image_url),
+            stock=product.stock,
+            sku=product.sku,
+        )
+        product_names.add(new_product.pk, new_product.name)
         return new_product.dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400,detail=str(e))
+
+LIST_FIELDS = ('id', 'name', 'price', 'stock', 'created_at')
+OPTIONAL_FIELDS = ('description', 'image_url', 'updated_at')
+
+def parse_fields(fields:str | None)-> list:
+    extra_fields = [field for field in fields.split(',') if field] if fields else []
+    unknown = set(extra_fields) - set(OPTIONAL_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return extra_fields
+
+def weak_etag(*parts)-> str:
+    return 'W/"' + hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest() + '"'
+
+def http_date(value:datetime)-> str:
+    # updated_at is a naive local timestamp (datetime.now)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def is_fresh(request:Request, etag:str, last_modified:datetime | None = None)-> bool:
+    """True when the client's copy is current, per If-None-Match or else If-Modified-Since."""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or etag.removeprefix('W/') in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if last_modified and if_modified_since:
+        try:
+            return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+# sort name -> (field, direction); every sort is keyset paged on (field, _id) and has a matching index
+SORTS = {
+    '-created_at': ('created_at', -1),
+    '-updated_at': ('updated_at', -1),
+    'price': ('price', 1),
+    '-price': ('price', -1),
+}
+
+def encode_cursor(product:Product, sort:str)-> str:
+    field, _ = SORTS[sort]
+    value = getattr(product, field)
+    raw = f"{sort}|{value.isoformat() if isinstance(value, datetime) else value}|{product.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor:str, sort:str):
+    try:
+        cursor_sort, value, product_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        field, _ = SORTS[sort]
+        return (float(value) if field == 'price' else datetime.fromisoformat(value)), ObjectId(product_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def listing_filter(min_price:float | None, max_price:float | None, in_stock:bool | None)-> dict:
+    match = {}
+    if min_price is not None or max_price is not None:
+        match['price'] = {}
+        if min_price is not None:
+            match['price']['$gte'] = min_price
+        if max_price is not None:
+            match['price']['$lte'] = max_price
+    if in_stock is not None:
+        match['stock'] = {'$gt': 0} if in_stock else {'$lte': 0}
+    return match
+
+def after_cursor(sort:str, value, product_id)-> Q:
+    field, direction = SORTS[sort]
+    operator = 'lt' if direction < 0 else 'gt'
+    return Q(**{f"{field}__{operator}": value}) | Q(**{field: value, f"id__{operator}": product_id})
+
+def _facets(match:dict)-> dict:
+    """Price buckets and availability for the filtered listing, in one $facet aggregation."""
+    pipeline = [
+        {'$match': match},
+        {'$facet': {
+            'price': [{'$bucket': {
+                'groupBy': '$price',
+                'boundaries': list(PRICE_BUCKETS),
+                'default': PRICE_BUCKETS[-1],
+                'output': {'count': {'$sum': 1}},
+            }}],
+            'availability': [{'$group': {'_id': {'$gt': ['$stock', 0]}, 'count': {'$sum': 1}}}],
+        }},
+    ]
+    result = next(Product._get_collection().aggregate(pipeline), {'price': [], 'availability': []})
+    counts = {bucket['_id']: bucket['count'] for bucket in result['price']}
+    bounds = list(PRICE_BUCKETS) + [None]
+    availability = {bucket['_id']: bucket['count'] for bucket in result['availability']}
+    return {
+        'price': [
+            {'min': low, 'max': high, 'count': counts.get(low, 0)}
+            for low, high in zip(bounds, bounds[1:])
+        ],
+        'availability': {'in_stock': availability.get(True, 0), 'out_of_stock': availability.get(False, 0)},
+    }
+
+async def get_products(
+    request:Request,
+    limit:int = Query(20, ge=1, le=100),
+    cursor:str | None = None,
+    fields:str | None = Query(None, description="Comma separated extra fields: description, image_url, updated_at"),
+    sort:Literal['-created_at', '-updated_at', 'price', '-price'] = '-created_at',
+    min_price:float | None = Query(None, ge=0),
+    max_price:float | None = Query(None, ge=0),
+    in_stock:bool | None = None,
+    facets:bool = Query(False, description="Include price and availability counts for the filtered listing"),
+):
+    try:
+        extra_fields = parse_fields(fields)
+        match = listing_filter(min_price, max_price, in_stock)
+
+        # keyset on (sort field, _id) so deep pages cost the same as the first
+        query = Q(__raw__=match) if match else None
+        if cursor:
+            keyset = after_cursor(sort, *decode_cursor(cursor, sort))
+            query = query & keyset if query else keyset
+        field, direction = SORTS[sort]
+        order = '' if direction > 0 else '-'
+        page = await products.find(
+            f"{order}{field}", f"{order}id",
+            query=query,
+            only=tuple(dict.fromkeys(LIST_FIELDS + tuple(extra_fields) + (field, 'updated_at'))),
+            limit=limit + 1,
+        )
+
+        # the page changes only if one of its products is written or the set of ids shifts;
+        # facets depend on the whole filtered set, so those responses are not conditional
+        headers = None
+        if not facets:
+            etag = weak_etag(request.url.query, [(product.pk, product.updated_at, product.stock) for product in page])
+            headers = {"ETag": etag, "Cache-Control": PRODUCT_CACHE_CONTROL}
+            if is_fresh(request, etag):
+                return Response(status_code=304, headers=headers)
+
+        next_cursor = encode_cursor(page[limit - 1], sort) if len(page) > limit else None
+        body = {
+            "items": [product.summary(extra_fields) for product in page[:limit]],
+            "next_cursor": next_cursor,
+        }
+        if facets and not cursor:
+            body["facets"] = await run_db(_facets, match)
+        # summaries are built here from typed fields, so ProductPage only documents the shape
+        return fast_json(body, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400,detail=str(e))
 
-async def get_products():
+def _search(text:str, fields:list, skip:int, limit:int):
+    return list(
+        Product.objects.search_text(text)
+        .only(*LIST_FIELDS, *fields)
+        .order_by('$text_score')
+        .skip(skip)
+        .limit(limit + 1)
+    )
+
+async def search_products(
+    q:str = Query(..., min_length=1, max_length=100),
+    limit:int = Query(20, ge=1, le=50),
+    page:int = Query(1, ge=1, le=SEARCH_MAX_PAGE),
+    fields:str | None = Query(None, description="Comma separated extra fields: description, image_url, updated_at"),
+):
+    """Full text search over name and description, best matches first."""
     try:
-        products=Product.objects()
-        return [product.dict() for product in products]
+        extra_fields = parse_fields(fields)
+        # relevance has no stable keyset to page on, so pages are offsets capped at SEARCH_MAX_PAGE
+        results = await run_db(_search, q, extra_fields, (page - 1) * limit, limit)
+        return fast_json({
+            "items": [
+                dict(product.summary(extra_fields), score=round(product.get_text_score(), 3))
+                for product in results[:limit]
+            ],
+            "next_page": page + 1 if len(results) > limit and page < SEARCH_MAX_PAGE else None,
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400,detail=str(e))
 
-async def get_product(product_id:str):
+def load_product_names():
+    collection = Product._get_collection()
+    product_names.rebuild((doc['_id'], doc['name']) for doc in collection.find({}, {'name': 1}))
+
+_refresh: asyncio.Task | None = None
+
+async def refresh_product_names():
+    """Build the index on first use; afterwards rebuild in the background when it is stale."""
+    global _refresh
+    if product_names.built_at is None:
+        await run_db(load_product_names)
+    elif product_names.stale and (_refresh is None or _refresh.done()):
+        _refresh = asyncio.create_task(run_db(load_product_names))
+
+async def autocomplete_products(
+    q:str = Query(..., min_length=1, max_length=100),
+    limit:int = Query(8, ge=1, le=20),
+):
     try:
-        product = Product.objects(id=ObjectId(product_id)).first()
+        await refresh_product_names()
+        return {
+            "suggestions": [
+                {"id": str(product_id), "name": name}
+                for product_id, name in product_names.complete(q, limit)
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400,detail=str(e))
+
+async def get_product(product_id:str, request:Request):
+    try:
+        product = await run_db(product_cache.get, ObjectId(product_id))
         if not product:
             raise HTTPException(status_code=404, detail="Product not Found")
-        return product.dict()
+        etag = weak_etag(product.pk, product.updated_at, product.stock)
+        headers = {"ETag": etag, "Cache-Control": PRODUCT_CACHE_CONTROL}
+        if product.updated_at:
+            headers["Last-Modified"] = http_date(product.updated_at)
+        if is_fresh(request, etag, product.updated_at):
+            return Response(status_code=304, headers=headers)
+        return fast_json(product.dict(), headers=headers)
+    except HTTPException:
+        raise
     except DoesNotExist:
         raise HTTPException(status_code=404,detail="Product not found")
     except Exception as e:
@@ -39,15 +278,19 @@ async def get_product(product_id:str):
     
 async def update_product(product_id:str,product_update:ProductUpdate):
     try:
-        product = Product.objects(id=ObjectId(product_id)).first()
+        product = await products.first(id=ObjectId(product_id))
         if not product:
             raise HTTPException(status_code=404, detail="Product not Found")
         update_data = product_update.dict(exclude_unset=True)
+        if update_data.get('image_url'):
+            update_data['image_url'] = await externalize_image(update_data['image_url'])
         for key, value in update_data.items():
             if value is not None:
                 setattr(product,key,value)
         product.updated_at = datetime.now()
-        product.save()
+        await products.save(product)
+        await run_db(product_cache.invalidate, product.pk)
+        product_names.add(product.pk, product.name)
 
         return product.dict()
     except DoesNotExist:
@@ -57,10 +300,12 @@ async def update_product(product_id:str,product_update:ProductUpdate):
 
 async def delete_product(product_id:str):
     try:
-        product = Product.objects(id=ObjectId(product_id)).first()
+        product = await products.first(id=ObjectId(product_id))
         if not product:
             raise HTTPException(status_code=404,detail="Product Not Found")
-        product.delete()
+        await products.delete(product)
+        await run_db(product_cache.invalidate, product.pk)
+        product_names.remove(product.pk)
         return {"message":"Product deleted successfully"}
     except DoesNotExist:
         raise HTTPException(status_code=404,detail="Product Not Found")
@@ -1,4 +1,24 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from passlib.context import CryptContext
+from src.core.instrumentation import LATENCY_BUCKETS, Counter, Gauge, Histogram, register
+from src.core.config import (
+    PASSWORD_WORKERS,
+    WORKERS,
+    PASSWORD_QUEUE_LIMIT,
+    JWT_SECRET,
+    JWT_ALGORITHM,
+    ACCESS_TOKEN_MINUTES,
+    TOKEN_CACHE_SIZE,
+)
 
 pwd_content = CryptContext(schemes=['bcrypt'],deprecated="auto")
 
@@ -6,4 +26,100 @@ def hash_password(password:str)-> str:
     return pwd_content.hash(password)
 
 def verify_password(plain_password:str, hashed_password:str)-> bool:
-    return pwd_content.verify(plain_password,hashed_password)
\ No newline at end of file
+    return pwd_content.verify(plain_password,hashed_password)
+
+# bcrypt is deliberately slow, so it runs in worker processes and never on the event loop
+_pool: ProcessPoolExecutor | None = None
+pool_in_flight = Gauge('password_pool_in_flight', 'Password hashes queued or running.')
+pool_queue_limit = Gauge('password_pool_queue_limit', 'Hashes allowed in flight before requests get a 429.')
+pool_queue_limit.value = PASSWORD_QUEUE_LIMIT
+pool_completed = Counter('password_pool_completed_total', 'Password hashes finished.', ())
+pool_rejected = Counter('password_pool_rejected_total', 'Password hashes refused because the queue was full.', ())
+hash_seconds = Histogram('password_pool_hash_seconds', 'Time a worker spent on one hash.', LATENCY_BUCKETS, ())
+wait_seconds = Histogram('password_pool_wait_seconds', 'Time a hash waited for a free worker.', LATENCY_BUCKETS, ())
+pool_completed.inc((), 0)
+pool_rejected.inc((), 0)
+register(pool_in_flight, pool_queue_limit, pool_completed, pool_rejected, hash_seconds, wait_seconds)
+
+def get_password_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS or max(1, os.cpu_count() // WORKERS))
+    return _pool
+
+def shutdown_password_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+async def _run_in_pool(func, *args):
+    if pool_in_flight.value >= PASSWORD_QUEUE_LIMIT:
+        pool_rejected.inc(())
+        raise HTTPException(status_code=429, detail="Too many authentication requests, try again shortly", headers={"Retry-After": "1"})
+    pool_in_flight.value += 1
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result, spent = await loop.run_in_executor(get_password_pool(), _timed, func, *args)
+    finally:
+        pool_in_flight.value -= 1
+    pool_completed.inc(())
+    hash_seconds.observe((), spent)
+    wait_seconds.observe((), time.perf_counter() - start - spent)
+    return result
+
+async def hash_password_async(password:str)-> str:
+    return await _run_in_pool(hash_password, password)
+
+async def verify_password_async(plain_password:str, hashed_password:str)-> bool:
+    return await _run_in_pool(verify_password, plain_password, hashed_password)
+
+def create_access_token(user_id:str, roles:list)-> str:
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": user_id,
+        "roles": roles,
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_MINUTES),
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+# decoded claims by raw token; verifying the signature on every request is the expensive part.
+# current_user_id is a sync dependency, so FastAPI calls it from several threadpool threads at once
+_token_cache: OrderedDict = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+def decode_access_token(token:str)-> dict:
+    with _token_cache_lock:
+        claims = _token_cache.get(token)
+        if claims is not None:
+            if claims["exp"] > time.time():
+                _token_cache.move_to_end(token)
+                return claims
+            del _token_cache[token]
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"require": ["sub", "exp"]})
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    with _token_cache_lock:
+        _token_cache[token] = claims
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return claims
+
+_bearer = HTTPBearer(auto_error=False)
+
+def current_user_id(credentials:HTTPAuthorizationCredentials | None = Depends(_bearer))-> str:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return decode_access_token(credentials.credentials)["sub"]
+
+def ensure_same_user(user_id:str, current_user:str):
+    if user_id != current_user:
+        raise HTTPException(status_code=403, detail="Not allowed to access another user's data")
@@ -0,0 +1,84 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text:str) -> str:
+    return ' '.join(_WORD.findall(text.casefold()))
+
+
+class PrefixIndex:
+    """Sorted in-memory index of names for prefix completion.
+
+    Every word boundary of a name gets its own key ("red running shoe",
+    "running shoe", "shoe") so typing any word of the name finds it. A lookup
+    is a bisect plus a short scan, independent of the catalog size. Writes
+    made by this process are applied in place; `stale` tells the owner when a
+    rebuild should pick up what other workers changed.
+    """
+
+    def __init__(self, max_age:float):
+        self.max_age = max_age
+        self.built_at = None
+        self._keys = []
+        self._names = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys_for(item_id, name:str) -> list:
+        words = normalize(name).split(' ')
+        return [(' '.join(words[index:]), item_id) for index in range(len(words)) if words[index]]
+
+    def rebuild(self, items):
+        """Replace the index with (id, name) pairs."""
+        names = {item_id: name for item_id, name in items}
+        keys = sorted(key for item_id, name in names.items() for key in self._keys_for(item_id, name))
+        with self._lock:
+            self._names, self._keys = names, keys
+            self.built_at = time.monotonic()
+
+    def add(self, item_id, name:str):
+        with self._lock:
+            self._remove(item_id)
+            self._names[item_id] = name
+            for key in self._keys_for(item_id, name):
+                insort(self._keys, key)
+
+    def remove(self, item_id):
+        with self._lock:
+            self._remove(item_id)
+
+    def _remove(self, item_id):
+        name = self._names.pop(item_id, None)
+        if name is None:
+            return
+        for key in self._keys_for(item_id, name):
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+
+    @property
+    def stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > self.max_age
+
+    def complete(self, prefix:str, limit:int = 10) -> list:
+        """[(id, name)] whose name has a word starting with prefix, full-name matches first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found, seen = [], set()
+        with self._lock:
+            index = bisect_left(self._keys, (prefix,))
+            while index < len(self._keys) and len(found) < limit * 4:
+                key, item_id = self._keys[index]
+                if not key.startswith(prefix):
+                    break
+                if item_id not in seen:
+                    seen.add(item_id)
+                    found.append((item_id, self._names[item_id]))
+                index += 1
+        found.sort(key=lambda match: not normalize(match[1]).startswith(prefix))
+        return found[:limit]
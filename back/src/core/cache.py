@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+import bson
+from src.core.config import CACHE_BACKEND, CACHE_URL
+
+try:
+    import redis
+except ImportError:  # only needed for CACHE_BACKEND=redis
+    redis = None
+
+
+class MemoryBackend:
+    """Thread-safe LRU with a per-entry TTL; values are opaque bytes."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires, value = entry
+                if expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, mapping):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class RedisBackend:
+    """Same interface over any Redis-protocol server."""
+
+    def __init__(self, url, ttl):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        return {key: value for key, value in zip(keys, self.client.mget(keys)) if value is not None}
+
+    def set_many(self, mapping):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipeline.setex(key, self.ttl, value)
+        pipeline.execute()
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*keys)
+
+
+def make_backend(maxsize, ttl):
+    if CACHE_BACKEND == 'redis':
+        return RedisBackend(CACHE_URL, ttl)
+    return MemoryBackend(maxsize, ttl)
+
+
+class DocumentCache:
+    """Read-through cache of mongoengine documents by id.
+
+    Entries are the stored BSON, so every hit builds a fresh document and
+    callers can mutate what they get back without touching the cache.
+    """
+
+    def __init__(self, document, backend):
+        self.document = document
+        self.backend = backend
+        self.stats = {'hits': 0, 'misses': 0, 'queries': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+
+    def _key(self, document_id):
+        return f"{self.document._get_collection_name()}:{document_id}"
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self.stats[name] += value
+
+    def get_many(self, ids):
+        """{id: document} for the ids that exist; misses are fetched in one $in query."""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        keys = {self._key(document_id): document_id for document_id in ids}
+        documents = {
+            keys[key]: self.document._from_son(bson.decode(value))
+            for key, value in self.backend.get_many(list(keys)).items()
+        }
+        missing = [document_id for document_id in ids if document_id not in documents]
+        self._count(hits=len(documents), misses=len(missing), queries=1 if missing else 0)
+        if missing:
+            fetched = {document.pk: document for document in self.document.objects(id__in=missing)}
+            self.backend.set_many({self._key(pk): bson.encode(document.to_mongo()) for pk, document in fetched.items()})
+            documents.update(fetched)
+        return documents
+
+    def get(self, document_id):
+        return self.get_many([document_id]).get(document_id)
+
+    def invalidate(self, *ids):
+        self._count(invalidations=len(ids))
+        self.backend.delete(*(self._key(document_id) for document_id in ids))
@@ -0,0 +1,89 @@
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE = ('application/json', 'text/', 'application/javascript', 'image/svg+xml')
+
+
+def _accepted(accept_encoding:str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding:str) -> str | None:
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware:
+    """Compresses buffered text and JSON bodies with br or gzip, as the client accepts.
+
+    Only single-message bodies of at least `minimum_size` bytes are touched;
+    streamed responses (files, event streams) and anything already encoded
+    pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size:int = 1024, gzip_level:int = 6, brotli_quality:int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body:bytes, encoding:str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                content_type = headers.get('content-type', '')
+                if 'content-encoding' in headers or not content_type.startswith(COMPRESSIBLE):
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get('body', b'')
+            headers = MutableHeaders(scope=start)
+            headers.add_vary_header('Accept-Encoding')
+            if message.get('more_body') or len(body) < self.minimum_size:
+                await send(start)
+                await send(message)
+                return
+            body = self.compress(body, encoding)
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = str(len(body))
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_compressed)
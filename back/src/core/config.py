@@ -1,10 +1,86 @@
 from dotenv import load_dotenv
 import os
+import secrets
 
 load_dotenv()
 
 PORT = os.getenv("PORT",5000)
 HOST = os.getenv('HOST',"127.0.0.1")
-DEBUG = os.getenv('DEBUG',True)
+DEBUG = os.getenv('DEBUG', 'false').lower() in ('1', 'true', 'yes')
 MONGO_URI = os.getenv('MONGO_URI')
-MONGO_DB = os.getenv('MONGO_DB')
\ No newline at end of file
+MONGO_DB = os.getenv('MONGO_DB')
+# web worker processes; DEBUG runs a single reloading process instead
+WORKERS = 1 if DEBUG else int(os.getenv('WORKERS', 0)) or os.cpu_count() or 1
+KEEP_ALIVE_SECONDS = int(os.getenv('KEEP_ALIVE_SECONDS', 5))
+BACKLOG = int(os.getenv('BACKLOG', 2048))
+LIMIT_CONCURRENCY = int(os.getenv('LIMIT_CONCURRENCY', 0))
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('GRACEFUL_TIMEOUT_SECONDS', 30))
+ACCESS_LOG = os.getenv('ACCESS_LOG', 'false').lower() == 'true'
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', 16))
+# per worker process; mongo calls run on the DB_EXECUTOR_WORKERS threads, so a
+# larger pool than that only helps the derivative and cache background work
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 32))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 8))
+MONGO_MAX_IDLE_MS = int(os.getenv('MONGO_MAX_IDLE_MS', 300000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 0))
+# e.g. "zstd,snappy,zlib"; zstd needs the zstandard package and snappy python-snappy
+MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
+MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+
+PUBLIC_URL = os.getenv('PUBLIC_URL', f"http://{HOST}:{PORT}")
+IMAGE_STORE_DIR = os.getenv('IMAGE_STORE_DIR', os.path.join(os.getcwd(), 'media', 'images'))
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', 5 * 1024 * 1024))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+# the unique carts.user index is built on every start either way
+ENSURE_INDEXES = os.getenv('ENSURE_INDEXES', 'true').lower() == 'true'
+PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', 0))
+PASSWORD_QUEUE_LIMIT = int(os.getenv('PASSWORD_QUEUE_LIMIT', 64))
+# set JWT_SECRET in production; the random fallback invalidates tokens on every restart, and
+# app.serve() shares one fallback between its workers through the environment
+JWT_SECRET = os.getenv('JWT_SECRET') or secrets.token_urlsafe(32)
+JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+ACCESS_TOKEN_MINUTES = int(os.getenv('ACCESS_TOKEN_MINUTES', 60))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 4096))
+# 'memory' is per process; use 'redis' (any Redis-protocol server) to share the cache between workers
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_URL = os.getenv('CACHE_URL', 'redis://127.0.0.1:6379/0')
+PRODUCT_CACHE_SIZE = int(os.getenv('PRODUCT_CACHE_SIZE', 10000))
+PRODUCT_CACHE_TTL = int(os.getenv('PRODUCT_CACHE_TTL', 30))
+# each worker keeps its own autocomplete index; this bounds how long other workers' writes go unseen
+AUTOCOMPLETE_REFRESH_SECONDS = int(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', 60))
+SEARCH_MAX_PAGE = int(os.getenv('SEARCH_MAX_PAGE', 50))
+# lower bounds of the listing's price facet; the last bucket is open ended
+PRICE_BUCKETS = tuple(float(bound) for bound in os.getenv('PRICE_BUCKETS', '0,10,25,50,100,250,500,1000').split(','))
+# sent with product detail and listing responses, which also carry ETags for revalidation
+PRODUCT_CACHE_CONTROL = os.getenv('PRODUCT_CACHE_CONTROL', 'public, max-age=30, stale-while-revalidate=60')
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+# stored responses for Idempotency-Key retries; a pending key whose lease runs out can be taken over
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 30))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 10))
+# 'stub' or "package.module:Class" implementing src.components.payment.gateway.PaymentGateway
+PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'stub')
+PAYMENT_WORKERS = int(os.getenv('PAYMENT_WORKERS', 8))
+# a payment left 'processing' this long (its worker died) is picked up again
+PAYMENT_STALL_SECONDS = int(os.getenv('PAYMENT_STALL_SECONDS', 120))
+PAYMENT_MAX_ATTEMPTS = int(os.getenv('PAYMENT_MAX_ATTEMPTS', 3))
+PAYMENT_EVENTS_TIMEOUT_SECONDS = int(os.getenv('PAYMENT_EVENTS_TIMEOUT_SECONDS', 60))
+PAYMENT_STUB_LATENCY_SECONDS = float(os.getenv('PAYMENT_STUB_LATENCY_SECONDS', 0.5))
+# payment methods the stub declines, for exercising the failure path
+PAYMENT_STUB_DECLINE = os.getenv('PAYMENT_STUB_DECLINE', 'declined')
+# hold stock when it goes into a cart instead of at checkout; holds lapse after STOCK_HOLD_SECONDS
+STOCK_RESERVATIONS = os.getenv('STOCK_RESERVATIONS', 'false').lower() == 'true'
+STOCK_HOLD_SECONDS = int(os.getenv('STOCK_HOLD_SECONDS', 15 * 60))
+STOCK_SWEEP_SECONDS = int(os.getenv('STOCK_SWEEP_SECONDS', 30))
+STOCK_SWEEP_BATCH = int(os.getenv('STOCK_SWEEP_BATCH', 500))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# per-logger overrides, e.g. "src.components.carts=DEBUG,pymongo=WARNING"
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 1.0))
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', 50))
@@ -1,5 +1,66 @@
-from mongoengine import connect
-from src.core.config import MONGO_URI,MONGO_DB
+import asyncio
+import time
+import logging
+from mongoengine import connect, disconnect, get_connection
+from src.core.config import (
+    MONGO_URI,
+    MONGO_DB,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+    MONGO_READ_PREFERENCE,
+)
+from src.core.executor import run_db
+from src.core.instrumentation import command_listener, pool_listener
 
-connect(host=MONGO_URI,db=MONGO_DB)
-CONNECTION_STRING = 'Database connected'
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+def client_options() -> dict:
+    options = {
+        'maxPoolSize': MONGO_MAX_POOL_SIZE,
+        'minPoolSize': MONGO_MIN_POOL_SIZE,
+        'maxIdleTimeMS': MONGO_MAX_IDLE_MS,
+        'waitQueueTimeoutMS': MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        'connectTimeoutMS': MONGO_CONNECT_TIMEOUT_MS,
+        'serverSelectionTimeoutMS': MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        'socketTimeoutMS': MONGO_SOCKET_TIMEOUT_MS or None,
+        'readPreference': MONGO_READ_PREFERENCE,
+        'event_listeners': [command_listener, pool_listener],
+    }
+    if MONGO_COMPRESSORS:
+        options['compressors'] = MONGO_COMPRESSORS
+    return options
+
+def connect_db():
+    """Create this process's Mongo client.
+
+    Called from the app lifespan so every worker opens its own pool after it
+    is forked; a MongoClient inherited across fork is not safe to use.
+    """
+    return connect(host=MONGO_URI,db=MONGO_DB,**client_options())
+
+def ping():
+    get_connection().admin.command('ping')
+
+async def warm_pool():
+    """Open MONGO_MIN_POOL_SIZE connections before the first request needs them.
+
+    The driver fills minPoolSize lazily in the background; concurrent pings
+    force the handshakes to happen now, while startup is still blocking.
+    """
+    start = time.perf_counter()
+    connections = max(1, min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE))
+    try:
+        await asyncio.gather(*(run_db(ping) for _ in range(connections)))
+    except Exception as e:
+        logger.error("mongo is not reachable", extra={"error": str(e)})
+        return
+    logger.info("mongo pool warmed", extra={"connections": connections, "ms": round((time.perf_counter() - start) * 1000, 1)})
+
+def disconnect_db():
+    disconnect()
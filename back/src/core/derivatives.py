@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from src.core.config import IMAGE_WORKERS
+from src.core.storage import blob_dir, find_blob, image_url, image_hash
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # derivatives are optional; originals are served without Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {'thumb': 160, 'card': 480, 'detail': 1024}
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpg': ('JPEG', 'image/jpeg')}
+
+# left in a blob's directory when Pillow cannot decode the original (e.g. SVGs stored before uploads were verified)
+UNSUPPORTED_MARKER = 'variants.unsupported'
+
+_pool: ProcessPoolExecutor | None = None
+
+def enabled() -> bool:
+    return Image is not None
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+# listings ask for every product on every request; the marker is only ever added, and builds
+# that add it in this process clear the cache, so a stat per digest per process is enough
+@lru_cache(maxsize=4096)
+def supports_variants(digest: str) -> bool:
+    return not os.path.exists(os.path.join(blob_dir(digest), UNSUPPORTED_MARKER))
+
+def _built(future):
+    if not future.cancelled() and future.exception() is None and future.result() is False:
+        supports_variants.cache_clear()
+
+def build_derivatives(digest: str) -> bool:
+    """Write every variant/format pair next to the original. Runs in a worker process.
+
+    Returns False, and marks the blob so its variants are no longer
+    advertised, when Pillow cannot decode the original.
+    """
+    original = find_blob(digest)
+    if not original:
+        return False
+    directory = blob_dir(digest)
+    try:
+        source = Image.open(original[0])
+        source.load()
+    except Exception:
+        open(os.path.join(directory, UNSUPPORTED_MARKER), 'w').close()
+        return False
+    with source:
+        source = ImageOps.exif_transpose(source)
+        for variant, size in VARIANTS.items():
+            resized = source.copy()
+            resized.thumbnail((size, size))
+            for extension, (image_format, _) in FORMATS.items():
+                target = os.path.join(directory, f"{variant}.{extension}")
+                if os.path.exists(target):
+                    continue
+                frame = resized.convert('RGB') if image_format == 'JPEG' else resized
+                with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+                    frame.save(tmp, image_format, quality=82)
+                os.replace(tmp.name, target)
+    return True
+
+def variant_path(digest: str, variant: str, extension: str) -> str:
+    return os.path.join(blob_dir(digest), f"{variant}.{extension}")
+
+async def ensure_variant(digest: str, variant: str, extension: str):
+    """Path of a derivative, building it in the pool if the upload-time job has not finished.
+
+    None when the original cannot be resized; callers serve the original instead.
+    """
+    path = variant_path(digest, variant, extension)
+    if os.path.exists(path):
+        return path
+    if not supports_variants(digest):
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        built = await loop.run_in_executor(get_pool(), build_derivatives, digest)
+    except Exception:
+        logger.exception("could not build image variants", extra={"hash": digest})
+        return None
+    if not built:
+        supports_variants.cache_clear()
+        return None
+    return path
+
+def schedule(digest: str):
+    """Queue derivative generation without waiting for it."""
+    if enabled():
+        get_pool().submit(build_derivatives, digest).add_done_callback(_built)
+
+def variant_urls(url: str | None):
+    """srcset-style map for a blob-store image URL, or None for external URLs."""
+    digest = image_hash(url)
+    if not digest or not enabled() or not supports_variants(digest):
+        return None
+    images = {variant: f"{image_url(digest)}/{variant}" for variant in VARIANTS}
+    images['srcset'] = ", ".join(f"{images[variant]} {size}w" for variant, size in VARIANTS.items())
+    return images
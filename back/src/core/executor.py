@@ -0,0 +1,28 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from src.core.config import DB_EXECUTOR_WORKERS
+
+_executor: ThreadPoolExecutor | None = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+    return _executor
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking mongoengine call on the db thread pool so the event loop stays free.
+
+    The caller's context is carried over so the Mongo commands are charged to its request.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), partial(context.run, func, *args, **kwargs))
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,275 @@
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from fastapi.responses import JSONResponse
+from pymongo import monitoring
+from starlette.datastructures import Headers, MutableHeaders
+from src.core.log import request_id
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current: ContextVar["RequestStats | None"] = ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """Mongo and serialization time spent on behalf of one HTTP request."""
+    __slots__ = ('db_commands', 'db_seconds', 'serialize_seconds', '_lock')
+
+    def __init__(self):
+        self.db_commands = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_command(self, seconds:float):
+        # commands for one request can finish on several db threads at once
+        with self._lock:
+            self.db_commands += 1
+            self.db_seconds += seconds
+
+    def server_timing(self, handler_seconds:float) -> str:
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.db_commands} commands", '
+            f'ser;dur={self.serialize_seconds * 1000:.2f}, '
+            f'handler;dur={handler_seconds * 1000:.2f}'
+        )
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+class CommandListener(monitoring.CommandListener):
+    """Attributes every Mongo command to the request whose context issued it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        stats = _current.get()
+        if stats is not None:
+            stats.add_command(event.duration_micros / 1_000_000)
+
+
+command_listener = CommandListener()
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that charges its render time to the current request."""
+
+    def render(self, content) -> bytes:
+        start = time.perf_counter()
+        body = self.encode(content)
+        stats = _current.get()
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - start
+        return body
+
+    def encode(self, content) -> bytes:
+        return super().render(content)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels:dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Histogram:
+    def __init__(self, name:str, help:str, buckets:tuple, labelnames:tuple):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labelnames = labelnames
+        self._series = {}
+
+    def observe(self, labels:tuple, value:float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series['buckets'][index] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels({**base, 'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels({**base, 'le': '+Inf'})} {series['count']}")
+            lines.append(f"{self.name}_sum{format_labels(base)} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{format_labels(base)} {series['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name:str, help:str, labelnames:tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._series = {}
+
+    def inc(self, labels:tuple, value:float = 1):
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f"{self.name}{format_labels(dict(zip(self.labelnames, labels)))} {value}")
+        return lines
+
+
+requests_total = Counter('http_requests_total', 'HTTP requests by route and status.', ('method', 'route', 'status'))
+request_seconds = Histogram('http_request_duration_seconds', 'Time until the response started.', LATENCY_BUCKETS, ('method', 'route'))
+db_seconds = Histogram('http_request_db_seconds', 'Mongo command time per request.', LATENCY_BUCKETS, ('method', 'route'))
+db_commands = Histogram('http_request_db_commands', 'Mongo commands issued per request.', COMMAND_BUCKETS, ('method', 'route'))
+serialize_seconds = Histogram('http_request_serialize_seconds', 'JSON rendering time per request.', LATENCY_BUCKETS, ('method', 'route'))
+METRICS = (requests_total, request_seconds, db_seconds, db_commands, serialize_seconds)
+
+
+def register(*metrics):
+    """Add metrics kept by other modules to what /metrics renders."""
+    global METRICS
+    METRICS += metrics
+
+
+def render_metrics() -> list:
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    return lines
+
+
+class InstrumentationMiddleware:
+    """Times each request, adds a Server-Timing header and feeds the per-route metrics.
+
+    It also sets the request id used by the logs: an incoming X-Request-ID is
+    kept, otherwise one is generated, and it is echoed back on the response.
+
+    Routes are labelled by their path template (/cart/{user_id}), so the series stay
+    bounded; requests that match no route are grouped under "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        rid = Headers(scope=scope).get('x-request-id', '')[:64] or uuid.uuid4().hex
+        rid_token = request_id.set(rid)
+        start = time.perf_counter()
+        status = 500
+        elapsed = None
+
+        async def send_with_timing(message):
+            nonlocal status, elapsed
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                elapsed = time.perf_counter() - start
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing', stats.server_timing(elapsed - stats.serialize_seconds))
+                headers.append('X-Request-ID', rid)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            request_id.reset(rid_token)
+            route = scope.get('route')
+            labels = (scope['method'], getattr(route, 'path', 'unmatched'))
+            requests_total.inc(labels + (str(status),))
+            request_seconds.observe(labels, elapsed if elapsed is not None else time.perf_counter() - start)
+            db_seconds.observe(labels, stats.db_seconds)
+            db_commands.observe(labels, stats.db_commands)
+            serialize_seconds.observe(labels, stats.serialize_seconds)
+
+
+class Gauge:
+    def __init__(self, name:str, help:str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+pool_wait_seconds = Histogram('mongo_pool_checkout_wait_seconds', 'Time spent waiting to check a connection out of the pool.', LATENCY_BUCKETS, ())
+pool_checkout_failures = Counter('mongo_pool_checkout_failures_total', 'Pool checkouts that failed, by reason.', ('reason',))
+pool_connections = Gauge('mongo_pool_connections', 'Open connections in this process.')
+pool_checked_out = Gauge('mongo_pool_checked_out', 'Connections currently checked out.')
+METRICS += (pool_wait_seconds, pool_checkout_failures, pool_connections, pool_checked_out)
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Feeds the pool metrics; events arrive on whichever db thread touched the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def connection_created(self, event):
+        with self._lock:
+            pool_connections.value += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool_connections.value -= 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool_checked_out.value += 1
+            pool_wait_seconds.observe((), event.duration or 0.0)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool_checkout_failures.inc((event.reason,))
+            pool_wait_seconds.observe((), event.duration or 0.0)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool_checked_out.value -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+pool_listener = PoolListener()
@@ -0,0 +1,136 @@
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from src.core.config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_DEBUG_SAMPLE_RATE, LOG_RATE_LIMIT
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# attributes every LogRecord has; anything else came in through extra= and is logged as a field
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id', 'color_message'}
+
+_listener: QueueListener | None = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps the record with the id of the request being handled, in the emitting thread."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of DEBUG records and caps how often one message may repeat.
+
+    Records below WARNING are limited to `rate_limit` per second for each
+    (logger, message template) pair; warnings and errors always pass.
+    """
+
+    def __init__(self, sample_rate:float, rate_limit:int):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self._window = 0
+        self._counts = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if record.levelno <= logging.DEBUG and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+        if self.rate_limit <= 0:
+            return True
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._counts = {}
+        key = (record.name, record.msg)
+        self._counts[key] = count = self._counts.get(key, 0) + 1
+        return count <= self.rate_limit
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting them first.
+
+    The stdlib handler renders the whole record (traceback included) in the
+    calling thread; only the message is resolved here so mutable args are
+    captured, and the rest of the work happens on the listener thread.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        fields = ' '.join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        return f"{text} {fields}" if fields else text
+
+
+def parse_levels(spec:str) -> dict:
+    """'src.components.carts=DEBUG,pymongo=WARNING' -> {logger name: level}"""
+    levels = {}
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = part.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Route all logging (uvicorn included) through one queue drained by a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+    handler = NonBlockingQueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_RATE, LOG_RATE_LIMIT))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL.upper())
+    for name in ('uvicorn', 'uvicorn.error', 'uvicorn.access'):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flush queued records; call once the app has stopped handling requests."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,40 @@
+import json
+from datetime import date, datetime
+from bson import ObjectId
+from src.core.instrumentation import TimedJSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(TimedJSONResponse):
+    """Compact JSON rendered with orjson when it is installed.
+
+    As the app's default response class it only replaces the final
+    json.dumps. Returned directly from a handler (see fast_json) it also
+    skips FastAPI's jsonable_encoder and response_model pass, so use it
+    only for content that is already plain dicts of known shape.
+    """
+
+    def encode(self, content) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content, status_code:int = 200, headers:dict | None = None) -> FastJSONResponse:
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
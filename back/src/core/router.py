@@ -10,4 +10,6 @@ from src.components.products.routes import *
 from src.components.carts.routes import *
 from src.components.order.routes import *
 from src.components.payment.routes import *
+from src.components.images.routes import *
+from src.components.metrics.routes import *
 base_router.add_api_route("/", health, methods=["GET"])
@@ -0,0 +1,126 @@
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from io import BytesIO
+from src.core.config import IMAGE_STORE_DIR, IMAGE_MAX_BYTES, PUBLIC_URL
+
+try:
+    from PIL import Image
+except ImportError:  # without Pillow uploads are checked by their signature alone
+    Image = None
+
+DATA_URL = re.compile(r'^data:(?P<mime>image/[\w.+-]+);base64,(?P<data>.*)$', re.DOTALL)
+# raster formats only: SVG can carry script, and these blobs are served from the API's origin
+IMAGE_TYPES = {
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+    'image/gif': (b'GIF87a', b'GIF89a'),
+    'image/webp': (b'RIFF',),
+}
+PILLOW_FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# what documents store for blob-store images: the path only, so changing PUBLIC_URL breaks no links.
+# The optional origin matches URLs saved before paths were stored.
+BLOB_PATH = re.compile(r'^(?:https?://[^/]+)?(?P<path>/images/(?P<digest>[0-9a-f]{64})(?P<variant>/\w+)?)$')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def is_data_url(value: str) -> bool:
+    return bool(value) and value.startswith('data:')
+
+def sniff_image(data: bytes) -> str:
+    """Content type the bytes really are; InvalidImage unless they are a raster image we accept."""
+    if Image is not None:
+        try:
+            with Image.open(BytesIO(data)) as image:
+                content_type = PILLOW_FORMATS.get(image.format)
+                image.verify()
+        except Exception:
+            raise InvalidImage("Image data could not be decoded")
+        if content_type is None:
+            raise InvalidImage(f"Unsupported image type; use one of {', '.join(IMAGE_TYPES)}")
+        return content_type
+    for content_type, signatures in IMAGE_TYPES.items():
+        if data.startswith(signatures) and (content_type != 'image/webp' or data[8:12] == b'WEBP'):
+            return content_type
+    raise InvalidImage(f"Unsupported image type; use one of {', '.join(IMAGE_TYPES)}")
+
+def decode_data_url(data_url: str):
+    match = DATA_URL.match(data_url.strip())
+    if not match:
+        raise InvalidImage("Expected a base64 image data URL")
+    if match.group('mime') not in IMAGE_TYPES:
+        raise InvalidImage(f"Unsupported image type; use one of {', '.join(IMAGE_TYPES)}")
+    try:
+        data = base64.b64decode(match.group('data'), validate=True)
+    except binascii.Error:
+        raise InvalidImage("Image data is not valid base64")
+    if not data:
+        raise InvalidImage("Image is empty")
+    if len(data) > IMAGE_MAX_BYTES:
+        raise InvalidImage(f"Image is larger than {IMAGE_MAX_BYTES} bytes")
+    # the declared type is only a claim; store what the bytes actually are
+    return data, sniff_image(data)
+
+def blob_dir(digest: str) -> str:
+    return os.path.join(IMAGE_STORE_DIR, digest[:2], digest)
+
+def save_blob(data: bytes, content_type: str) -> str:
+    """Store bytes under their sha256; identical uploads share one file."""
+    digest = hashlib.sha256(data).hexdigest()
+    directory = blob_dir(digest)
+    if find_blob(digest):
+        return digest
+    os.makedirs(directory, exist_ok=True)
+    extension = mimetypes.guess_extension(content_type) or '.bin'
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, os.path.join(directory, f"original{extension}"))
+    return digest
+
+def find_blob(digest: str, variant: str = 'original'):
+    """Return (path, content_type) for a stored blob, or None."""
+    if not HASH_PATTERN.match(digest):
+        return None
+    directory = blob_dir(digest)
+    if not os.path.isdir(directory):
+        return None
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if stem == variant:
+            content_type = mimetypes.types_map.get(extension, 'application/octet-stream')
+            return os.path.join(directory, name), content_type
+    return None
+
+def store_data_url(data_url: str) -> str:
+    data, content_type = decode_data_url(data_url)
+    return save_blob(data, content_type)
+
+def image_path(digest: str) -> str:
+    """What a document stores for a blob; public_url() turns it into a link."""
+    return f"/images/{digest}"
+
+def image_url(digest: str) -> str:
+    return f"{PUBLIC_URL}{image_path(digest)}"
+
+def stored_image(url: str | None):
+    """Path to store for one of our image URLs; anything else is kept as given."""
+    match = BLOB_PATH.match(url) if url else None
+    return match.group('path') if match else url
+
+def public_url(value: str | None):
+    """Absolute URL for a stored image, built from the current PUBLIC_URL."""
+    match = BLOB_PATH.match(value) if value else None
+    return f"{PUBLIC_URL}{match.group('path')}" if match else value
+
+def image_hash(url: str | None):
+    """Digest behind a stored image path or one of our URLs; None for anything else."""
+    match = BLOB_PATH.match(url) if url else None
+    return match.group('digest') if match and not match.group('variant') else None
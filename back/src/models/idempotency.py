@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+from fastapi import HTTPException, Request, Response
+from pymongo.errors import DuplicateKeyError
+from src.core.config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_LEASE_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+from src.core.executor import run_db
+from src.core.responses import FastJSONResponse
+from src.models.user import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# failures a retry is expected to get past, so they are not replayed
+RETRYABLE = {409, 429}
+
+# recomputed for every response, so not part of what is stored
+UNSTORED_HEADERS = {'content-length', 'content-type'}
+
+# same-process duplicates wake as soon as the original finishes instead of polling
+_finished: dict[str, asyncio.Event] = {}
+
+
+def _collection():
+    return IdempotencyRecord._get_collection()
+
+
+def _claim(record_id, fingerprint):
+    """Insert a pending record, or take over one whose owner's lease ran out. True if we own it."""
+    now = datetime.now()
+    lease = now + timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    try:
+        _collection().insert_one({
+            '_id': record_id,
+            'fingerprint': fingerprint,
+            'state': 'pending',
+            'lease_until': lease,
+            'expires_at': now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        })
+        return True
+    except DuplicateKeyError:
+        result = _collection().update_one(
+            {'_id': record_id, 'fingerprint': fingerprint, 'state': 'pending', 'lease_until': {'$lt': now}},
+            {'$set': {'lease_until': lease}},
+        )
+        return result.modified_count == 1
+
+
+def _store(record_id, response):
+    headers = {name: value for name, value in response.headers.items() if name not in UNSTORED_HEADERS}
+    _collection().update_one(
+        {'_id': record_id},
+        {
+            '$set': {'state': 'done', 'status_code': response.status_code, 'headers': headers, 'body': bytes(response.body)},
+            '$unset': {'lease_until': ''},
+        },
+    )
+
+
+def _release(record_id):
+    _collection().delete_one({'_id': record_id, 'state': 'pending'})
+
+
+def _replay(record):
+    return Response(
+        content=record['body'],
+        status_code=record['status_code'],
+        media_type='application/json',
+        headers={**record.get('headers', {}), 'Idempotent-Replayed': 'true'},
+    )
+
+
+async def _wait_for(record_id, fingerprint):
+    """Block a duplicate until the original stores its response, then replay it."""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while True:
+        record = await run_db(_collection().find_one, {'_id': record_id})
+        if record is None:
+            # the original failed and released the key; this request may run it
+            return None
+        if record['fingerprint'] != fingerprint:
+            raise HTTPException(status_code=422, detail=f"{HEADER} was already used with a different request")
+        if record['state'] == 'done':
+            return _replay(record)
+        if record.get('lease_until') and record['lease_until'] < datetime.now():
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={'Retry-After': '1'},
+            )
+        event = _finished.get(record_id)
+        try:
+            if event is not None:
+                await asyncio.wait_for(event.wait(), timeout=min(delay, remaining))
+            else:
+                await asyncio.sleep(min(delay, remaining))
+        except asyncio.TimeoutError:
+            pass
+        delay = min(delay * 2, 0.5)
+
+
+async def idempotent(request:Request, user_id:str, scope:str, fingerprint:str, handler):
+    """Run handler() at most once per Idempotency-Key and replay its stored response to retries.
+
+    Without the header the handler simply runs. Successful and client-error
+    responses are stored for IDEMPOTENCY_TTL_SECONDS (a TTL index removes them);
+    server errors release the key so the client can retry for real.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return await handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+    record_id = f"{user_id}:{scope}:{key}"
+    fingerprint = hashlib.sha256(fingerprint.encode()).hexdigest()
+
+    while not await run_db(_claim, record_id, fingerprint):
+        replay = await _wait_for(record_id, fingerprint)
+        if replay is not None:
+            return replay
+
+    event = _finished[record_id] = asyncio.Event()
+    try:
+        try:
+            content = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500 or e.status_code in RETRYABLE:
+                raise
+            response = FastJSONResponse({'detail': e.detail}, status_code=e.status_code, headers=e.headers)
+        else:
+            response = content if isinstance(content, Response) else FastJSONResponse(content)
+        await run_db(_store, record_id, response)
+        return response
+    except BaseException:
+        await run_db(_release, record_id)
+        raise
+    finally:
+        event.set()
+        _finished.pop(record_id, None)
@@ -0,0 +1,62 @@
+from datetime import datetime
+from bson import ObjectId
+from src.models.user import Role, User, Product, Cart, Order, Payment, IdempotencyRecord, StockHold
+
+DOCUMENTS = (Role, User, Product, Cart, Order, Payment, IdempotencyRecord, StockHold)
+# writes that are only correct with these indexes in place (one cart per user); built on every start
+REQUIRED = (Cart,)
+
+# the lookups every request path depends on; explain() should show an IXSCAN for each
+HOT_QUERIES = {
+    'users by email': lambda: User.objects(email='someone@example.com'),
+    'cart by user': lambda: Cart.objects(user=ObjectId()),
+    'orders by user': lambda: Order.objects(user=ObjectId()).order_by('-created_at', '-id'),
+    'payments by order': lambda: Payment.objects(order=ObjectId()),
+    'expired stock holds': lambda: StockHold.objects(expires_at__lt=datetime.now()).limit(500),
+    'stalled payments': lambda: Payment.objects(status='processing', updated_at__lt=datetime.now()),
+    'product listing': lambda: Product.objects.order_by('-created_at', '-id'),
+    'products by price': lambda: Product.objects(price__gte=10, price__lte=50, stock__gt=0).order_by('price', 'id'),
+    'recently updated products': lambda: Product.objects.order_by('-updated_at', '-id'),
+    'product search': lambda: Product.objects.search_text('shoe').order_by('$text_score'),
+}
+
+
+def ensure_indexes():
+    """Create every declared index. Returns {collection: error or None} so one bad collection does not hide the rest."""
+    report = {}
+    for document in DOCUMENTS:
+        name = document._get_collection_name()
+        try:
+            document.ensure_indexes()
+            report[name] = None
+        except Exception as e:
+            report[name] = str(e)
+    return report
+
+
+def ensure_required_indexes():
+    """Create the REQUIRED indexes, raising if one cannot be built so the app does not start without it."""
+    for document in REQUIRED:
+        try:
+            document.ensure_indexes()
+        except Exception as e:
+            raise RuntimeError(f"required indexes on {document._get_collection_name()} could not be built: {e}") from e
+
+
+def _stages(plan):
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages += _stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += _stages(child)
+    return [stage for stage in stages if stage]
+
+
+def explain_hot_queries():
+    """Winning plan stages per hot query, e.g. {'users by email': ['FETCH', 'IXSCAN']}."""
+    report = {}
+    for name, query in HOT_QUERIES.items():
+        plan = query().explain().get('queryPlanner', {}).get('winningPlan', {})
+        report[name] = _stages(plan)
+    return report
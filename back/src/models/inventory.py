@@ -0,0 +1,204 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from src.core.config import STOCK_HOLD_SECONDS, STOCK_SWEEP_SECONDS, STOCK_SWEEP_BATCH
+from src.core.executor import run_db
+from src.models.user import Product, StockHold, product_cache
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(Exception):
+    def __init__(self, product_id):
+        super().__init__(f"not enough stock for product {product_id}")
+        self.product_id = product_id
+
+
+def reserve_stock(quantities):
+    """Atomically take quantities ({product_id: qty}) out of stock in one bulk_write.
+
+    Each line is a conditional $inc on stock >= qty. The upsert flag turns a
+    failed condition into a duplicate _id error, which stops the ordered bulk
+    at that line; every line before it is then put back.
+    """
+    lines = list(quantities.items())
+    if not lines:
+        return
+    collection = Product._get_collection()
+    # stock is part of what clients cache, so it moves updated_at (and Last-Modified) too
+    now = datetime.now()
+    requests = [
+        UpdateOne({'_id': product_id, 'stock': {'$gte': quantity}}, {'$inc': {'stock': -quantity}, '$set': {'updated_at': now}}, upsert=True)
+        for product_id, quantity in lines
+    ]
+    try:
+        result = collection.bulk_write(requests, ordered=True)
+    except BulkWriteError as e:
+        failed = e.details['writeErrors'][0]['index']
+        phantoms = {upsert['_id'] for upsert in e.details.get('upserted', [])}
+        _undo_reserve(collection, lines[:failed], phantoms)
+        raise OutOfStock(next((product_id for product_id, _ in lines[:failed] if product_id in phantoms), lines[failed][0]))
+    product_cache.invalidate(*quantities)
+    phantoms = set(result.upserted_ids.values())
+    if phantoms:
+        _undo_reserve(collection, lines, phantoms)
+        raise OutOfStock(next(product_id for product_id, _ in lines if product_id in phantoms))
+
+
+def _undo_reserve(collection, applied, phantoms):
+    """Put back the lines reserve_stock already applied.
+
+    A line whose product was deleted after it was read matched nothing and was
+    upserted as a bare {_id, stock} document; those phantoms are removed
+    instead of being given stock. Upserts take the filter's _id, so phantoms
+    are matched by product id rather than by (driver-reported) index.
+    """
+    if phantoms:
+        collection.delete_many({'_id': {'$in': list(phantoms)}})
+    release_stock({product_id: quantity for product_id, quantity in applied if product_id not in phantoms})
+
+
+def release_stock(quantities):
+    """Give quantities back to stock, e.g. when a checkout fails after reserving."""
+    if not quantities:
+        return
+    Product._get_collection().bulk_write(
+        [
+            UpdateOne({'_id': product_id}, {'$inc': {'stock': quantity}, '$set': {'updated_at': datetime.now()}})
+            for product_id, quantity in quantities.items()
+        ],
+        ordered=False,
+    )
+    product_cache.invalidate(*quantities)
+
+
+def _move_reserved(changes, now):
+    """Apply {product_id: units} going back from reserved to stock (negative: the other way)."""
+    if not changes:
+        return
+    Product._get_collection().bulk_write(
+        [
+            UpdateOne({'_id': product_id}, {'$inc': {'stock': units, 'reserved': -units}, '$set': {'updated_at': now}})
+            for product_id, units in changes.items()
+        ],
+        ordered=False,
+    )
+    product_cache.invalidate(*changes)
+
+
+def hold_stock(user_id, product_id, quantity):
+    """Move quantity from stock into reserved for the user's cart and (re)start the hold's clock.
+
+    The product update is a conditional $inc, so two carts can never hold the
+    same unit. It happens before the hold is written: a crash in between
+    leaves units stuck in reserved, which is safer than a hold for stock that
+    was never taken. Returns the hold's expiry.
+    """
+    now = datetime.now()
+    taken = Product._get_collection().update_one(
+        {'_id': product_id, 'stock': {'$gte': quantity}},
+        {'$inc': {'stock': -quantity, 'reserved': quantity}, '$set': {'updated_at': now}},
+    )
+    if not taken.modified_count:
+        raise OutOfStock(product_id)
+    product_cache.invalidate(product_id)
+    expires_at = now + timedelta(seconds=STOCK_HOLD_SECONDS)
+    try:
+        StockHold._get_collection().update_one(
+            {'user': user_id, 'product': product_id},
+            {'$inc': {'quantity': quantity}, '$set': {'expires_at': expires_at}},
+            upsert=True,
+        )
+    except Exception:
+        _move_reserved({product_id: quantity}, now)
+        raise
+    return expires_at
+
+
+def undo_hold(user_id, product_id, quantity):
+    """Take back only the quantity one hold_stock call added, leaving the rest of the hold alone."""
+    StockHold._get_collection().update_one({'user': user_id, 'product': product_id}, {'$inc': {'quantity': -quantity}})
+    StockHold._get_collection().delete_one({'user': user_id, 'product': product_id, 'quantity': {'$lte': 0}})
+    _move_reserved({product_id: quantity}, datetime.now())
+
+
+def release_hold(user_id, product_id):
+    """Give a cart line's hold back to stock, e.g. when the line is removed. Returns the units released."""
+    hold = StockHold._get_collection().find_one_and_delete({'user': user_id, 'product': product_id})
+    if not hold:
+        return 0
+    _move_reserved({product_id: hold['quantity']}, datetime.now())
+    return hold['quantity']
+
+
+def held_quantities(user_id, product_ids):
+    """{product_id: units} the user still holds (unexpired) among product_ids."""
+    holds = StockHold._get_collection().find(
+        {'user': user_id, 'product': {'$in': list(product_ids)}, 'expires_at': {'$gt': datetime.now()}},
+        {'product': 1, 'quantity': 1},
+    )
+    return {hold['product']: hold['quantity'] for hold in holds}
+
+
+def convert_holds(user_id, quantities):
+    """Turn the user's holds into sold stock for an order of {product_id: qty}.
+
+    Held units were taken out of stock when they went into the cart, so no
+    stock condition is checked for them: each unexpired hold is claimed with
+    find_one_and_delete (a hold the sweeper reaches first is simply missing)
+    and only leaves reserved. Returns {product_id: units converted}; the rest
+    of the order has to come from stock as usual. Units held beyond the
+    ordered quantity go back to stock.
+    """
+    now = datetime.now()
+    converted, surplus = {}, {}
+    collection = StockHold._get_collection()
+    for product_id, quantity in quantities.items():
+        hold = collection.find_one_and_delete({'user': user_id, 'product': product_id, 'expires_at': {'$gt': now}})
+        if not hold:
+            continue
+        converted[product_id] = min(hold['quantity'], quantity)
+        if hold['quantity'] > quantity:
+            surplus[product_id] = hold['quantity'] - quantity
+    if converted:
+        Product._get_collection().bulk_write(
+            [UpdateOne({'_id': product_id}, {'$inc': {'reserved': -units}}) for product_id, units in converted.items()],
+            ordered=False,
+        )
+    _move_reserved(surplus, now)
+    return converted
+
+
+def sweep_expired_holds(batch_size=STOCK_SWEEP_BATCH):
+    """Release up to batch_size lapsed holds back to stock.
+
+    Candidates come from the expires_at index; each is then claimed with a
+    conditional find_one_and_delete, so workers sweeping at the same time (or
+    a checkout converting the hold) never return the same units twice.
+    Returns (candidates found, holds released); a full batch of candidates
+    means there may be more to sweep.
+    """
+    now = datetime.now()
+    collection = StockHold._get_collection()
+    expired = [hold['_id'] for hold in collection.find({'expires_at': {'$lte': now}}, {'_id': 1}).limit(batch_size)]
+    released, count = {}, 0
+    for hold_id in expired:
+        hold = collection.find_one_and_delete({'_id': hold_id, 'expires_at': {'$lte': now}})
+        if hold:
+            released[hold['product']] = released.get(hold['product'], 0) + hold['quantity']
+            count += 1
+    _move_reserved(released, now)
+    return len(expired), count
+
+
+async def run_hold_sweeper():
+    """Background task: sweep lapsed holds every STOCK_SWEEP_SECONDS, draining big backlogs batch by batch."""
+    while True:
+        try:
+            while (await run_db(sweep_expired_holds))[0] >= STOCK_SWEEP_BATCH:
+                await asyncio.sleep(0)
+        except Exception:
+            logger.exception("stock hold sweep failed")
+        await asyncio.sleep(STOCK_SWEEP_SECONDS)
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import List, Optional, Dict, Any
 
 class UserCreate(BaseModel):
@@ -28,12 +29,28 @@ class ProductOut(BaseModel):
     image_url: str
     stock: int
 
+class ProductListItem(BaseModel):
+    id: str
+    name: str
+    price: float
+    stock: int
+    description: Optional[str] = None
+    image_url: Optional[str] = None
+    images: Optional[Dict[str, str]] = None
+    updated_at: Optional[datetime] = None
+
+class ProductPage(BaseModel):
+    items: List[ProductListItem]
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, Any]] = None
+
 class ProductCreate(BaseModel):
     name: str
     description: str
     price: float
     image_url: str
     stock: int
+    sku: Optional[str] = None
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
@@ -41,6 +58,7 @@ class ProductUpdate(BaseModel):
     price: Optional[float] = None
     image_url: Optional[str] = None
     stock: Optional[int] = None
+    sku: Optional[str] = None
 
 class CartItemCreate(BaseModel):
     product_id: str
@@ -0,0 +1,53 @@
+from src.core.executor import run_db
+from src.models.user import Role, User, Product, Cart, Order, Payment
+
+
+class Repository:
+    """Awaitable access to a mongoengine document; every call runs on the db executor."""
+
+    def __init__(self, document):
+        self.document = document
+
+    async def first(self, **filters):
+        return await run_db(lambda: self.document.objects(**filters).first())
+
+    async def get(self, **filters):
+        return await run_db(self.document.objects.get, **filters)
+
+    async def find(self, *order_by, query=None, only=None, limit=None, **filters):
+        def fetch():
+            queryset = self.document.objects(query, **filters).order_by(*order_by)
+            if only:
+                queryset = queryset.only(*only)
+            if limit:
+                queryset = queryset.limit(limit)
+            return list(queryset)
+        return await run_db(fetch)
+
+    async def create(self, **fields):
+        return await run_db(lambda: self.document(**fields).save())
+
+    async def save(self, document):
+        return await run_db(document.save)
+
+    async def update(self, document, **update):
+        return await run_db(lambda: self.document.objects(pk=document.pk).update_one(**update))
+
+    async def delete(self, document):
+        return await run_db(document.delete)
+
+    async def deref(self, document, field):
+        # ReferenceFields hit Mongo on first attribute access
+        return await run_db(getattr, document, field)
+
+    async def serialize(self, document, *args):
+        # dict() dereferences ReferenceFields lazily, so it has to leave the event loop too
+        return await run_db(document.dict, *args)
+
+
+roles = Repository(Role)
+users = Repository(User)
+products = Repository(Product)
+carts = Repository(Cart)
+orders = Repository(Order)
+payments = Repository(Payment)
@@ -1,4 +1,6 @@
+import logging
 from datetime import datetime
+from bson import DBRef
 from mongoengine import (
     Document,
     StringField,
@@ -7,10 +9,19 @@ from mongoengine import (
     ListField,
     FloatField,
     IntField,
+    BinaryField,
+    DictField,
     DateTimeField,
     EmbeddedDocument,
     EmbeddedDocumentListField,
 )
+from src.core.derivatives import variant_urls
+from src.core.storage import is_data_url, image_hash, image_path, public_url
+from src.core.cache import DocumentCache, make_backend
+from src.core.autocomplete import PrefixIndex
+from src.core.config import PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL, AUTOCOMPLETE_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
         
 class Role(Document):
     roles = ListField(StringField(required=True))
@@ -38,7 +49,10 @@ class User(Document):
     )
     role = ReferenceField(Role)
     updated_at = DateField(default=datetime.now())
-    meta = {'collection':'users'}
+    meta = {
+        'collection':'users',
+        'indexes': [{'fields': ['email'], 'unique': True}],
+    }
 
     def dict(self):
         try:
@@ -59,9 +73,24 @@ class Product(Document):
     price = FloatField(required=True)
     image_url = StringField(required=True)
     stock = IntField(required=True, default=0)
+    # units held in carts (STOCK_RESERVATIONS); already taken out of stock
+    reserved = IntField(default=0)
+    sku = StringField()
     created_at = DateTimeField(default=datetime.now)
     updated_at = DateTimeField(default=datetime.now)
-    meta = {'collection':'products'}
+    meta = {
+        'collection':'products',
+        'indexes': [
+            ('-created_at', '-id'),
+            ('-updated_at', '-id'),
+            ('price', 'id'),
+            {
+                'fields': ['$name', '$description'],
+                'default_language': 'english',
+                'weights': {'name': 10, 'description': 2},
+            },
+        ],
+    }
     
     def dict(self):
         try:
@@ -70,21 +99,59 @@ class Product(Document):
                 "name": self.name,
                 "description": self.description,
                 "price": self.price,
-                "image_url": self.image_url,
+                "image_url": public_url(self.image_url),
+                "images": variant_urls(self.image_url),
                 "stock": self.stock,
+                "sku": self.sku,
                 "updated_at":self.updated_at
             }
         except:
             return{}
 
+    def summary(self, fields=()):
+        summary = {
+            "id": str(self.pk),
+            "name": self.name,
+            "price": self.price,
+            "stock": self.stock,
+        }
+        for field in fields:
+            summary[field] = getattr(self, field)
+        if 'image_url' in fields:
+            summary['image_url'] = public_url(self.image_url)
+            summary['images'] = variant_urls(self.image_url)
+        return summary
+
+product_cache = DocumentCache(Product, make_backend(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL))
+product_names = PrefixIndex(AUTOCOMPLETE_REFRESH_SECONDS)
+
+def ref_id(document, field):
+    """Id behind a ReferenceField without dereferencing it."""
+    value = document._data.get(field)
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, Document):
+        return value.pk
+    return value
+
+def raw_items(document):
+    """Embedded items as stored; reading document.items makes mongoengine fetch every full product."""
+    return document._data.get('items') or []
+
+def load_products(items):
+    """Every product referenced by items, keyed by id; cache misses cost one $in query."""
+    ids = [ref_id(item, 'product') for item in items]
+    return product_cache.get_many([product_id for product_id in ids if product_id])
+
 class CartItem(EmbeddedDocument):
     product = ReferenceField(Product, required=True)
     quantity = IntField(required=True, default=1)
 
-    def dict(self):
+    def dict(self, products=None):
         try:
+            product = products.get(ref_id(self, 'product')) if products is not None else self.product
             return{
-                "product": self.product.dict() if self.product else None,
+                "product": product.dict() if product else None,
                 "quantity": self.quantity
             }
         except:
@@ -95,44 +162,88 @@ class Cart(Document):
     items = EmbeddedDocumentListField(CartItem, default=[])
     created_at = DateTimeField(default=datetime.now)
     updated_at = DateTimeField(default=datetime.now)
-    meta = {'collection': 'carts'}
+    meta = {
+        'collection': 'carts',
+        'indexes': [{'fields': ['user'], 'unique': True}],
+    }
 
-    def dict(self):
+    def dict(self, products=None):
         try:
+            if products is None:
+                products = load_products(raw_items(self))
             safe_items = []
-            for item in self.items:
+            for item in raw_items(self):
                 try:
-                    if item.product and hasattr(item.product, 'id'):
-                        item_dict = item.dict()
+                    if ref_id(item, 'product') in products:
+                        item_dict = item.dict(products)
                         safe_items.append(item_dict)
                     else:
-                        print(f"Skipping cart item with invalid product reference")
+                        logger.debug("skipping cart item with invalid product reference", extra={"cart_id": str(self.pk)})
                 except Exception as item_error:
-                    print(f"Error processing cart item: {item_error}")
+                    logger.warning("could not serialize cart item", extra={"cart_id": str(self.pk), "error": str(item_error)})
                     continue
             
             return {
                 "id": str(self.pk),
-                "user": str(self.user.id),
+                "user": str(ref_id(self, 'user')),
                 "items": safe_items,
             }
         except Exception as e:
-            print(f"Error in Cart.dict(): {e}")
+            logger.exception("Cart.dict failed")
             return {
                 "id": str(self.pk) if hasattr(self, 'pk') else None,
-                "user": str(self.user.id) if self.user else None,
+                "user": str(ref_id(self, 'user')) if ref_id(self, 'user') else None,
                 "items": [],
             }
 
+UNAVAILABLE_PRODUCT = "Unavailable product"
+
+def product_snapshot(product):
+    """What an order line keeps of its product: name, SKU and a thumbnail URL, never inline image data."""
+    if product is None:
+        return {"name": UNAVAILABLE_PRODUCT, "sku": None, "image_url": None}
+    if variant_urls(product.image_url):
+        thumbnail = f"{image_path(image_hash(product.image_url))}/thumb"
+    else:
+        thumbnail = None if not product.image_url or is_data_url(product.image_url) else product.image_url
+    return {"name": product.name, "sku": product.sku, "image_url": thumbnail}
+
 class OrderItem(EmbeddedDocument):
     product = ReferenceField(Product, required=True)
     quantity = IntField(required=True)
     price = FloatField(required=True)
+    # snapshot taken at checkout; lines written before snapshots existed have no name
+    name = StringField()
+    sku = StringField()
+    image_url = StringField()
 
-    def dict(self):
+    @classmethod
+    def snapshot(cls, product, quantity):
+        return cls(product=product, quantity=quantity, price=product.price, **product_snapshot(product))
+
+    @property
+    def has_snapshot(self):
+        return self.name is not None
+
+    def dict(self, products=None):
+        if self.has_snapshot:
+            return {
+                "product": {
+                    "id": str(ref_id(self, 'product')),
+                    "name": self.name,
+                    "sku": self.sku,
+                    "price": self.price,
+                    "image_url": public_url(self.image_url),
+                    "images": {"thumb": public_url(self.image_url)} if self.image_url else None,
+                },
+                "quantity": self.quantity,
+                "price": self.price,
+                "subtotal": self.price * self.quantity
+            }
         try:
+            product = products.get(ref_id(self, 'product')) if products is not None else self.product
             return{
-                "product": self.product.dict() if self.product else None,
+                "product": product.dict() if product else None,
                 "quantity": self.quantity,
                 "price": self.price,
                 "subtotal": self.price * self.quantity
@@ -147,36 +258,83 @@ class Order(Document):
     status = StringField(required=True, default="pending")
     created_at = DateTimeField(default=datetime.now)
     updated_at = DateTimeField(default=datetime.now)
-    meta = {"collection": 'orders'}
+    meta = {
+        "collection": 'orders',
+        'indexes': [('user', '-created_at', '-id')],
+    }
 
-    def dict(self):
+    def dict(self, products=None):
         try:
+            if products is None:
+                products = load_products([item for item in raw_items(self) if not item.has_snapshot])
             return{
                 'id': str(self.pk),
-                'user': str(self.user.id),
-                "items": [item.dict() for item in self.items],
+                'user': str(ref_id(self, 'user')),
+                "items": [item.dict(products) for item in raw_items(self)],
                 'total_amount': self.total_amount,
                 'status': self.status,
+                'created_at': self.created_at,
             }
         except:
             return{}
 
 class Payment(Document):
+    # pending -> processing -> completed | failed; the payment pipeline moves it with conditional updates
     order = ReferenceField(Order, required=True)
+    user = ReferenceField(User)
     amount = FloatField(required=True)
     payment_method = StringField(required=True)
-    status = StringField(required=True, default="completed")
+    status = StringField(required=True, default="pending")
+    gateway_reference = StringField()
+    failure_reason = StringField()
+    attempts = IntField(default=0)
     created_at = DateTimeField(default=datetime.now)
-    meta = {'collection': 'payments'} 
+    updated_at = DateTimeField(default=datetime.now)
+    meta = {
+        'collection': 'payments',
+        'indexes': ['order', ('status', 'updated_at')],
+    }
 
     def dict(self):
         try:
             return{
                 "id": str(self.pk),
-                "order": str(self.order.id),
+                "order": str(ref_id(self, 'order')),
                 'amount': self.amount,
                 'payment_method': self.payment_method,
                 'status': self.status,
+                'failure_reason': self.failure_reason,
+                'updated_at': self.updated_at,
             }
         except:
-            return{}
\ No newline at end of file
+            return{}
+
+class IdempotencyRecord(Document):
+    # "<user>:<scope>:<Idempotency-Key>", so the key only has to be unique per user and route
+    id = StringField(primary_key=True)
+    fingerprint = StringField(required=True)
+    state = StringField(required=True, default="pending")
+    status_code = IntField()
+    headers = DictField()
+    body = BinaryField()
+    lease_until = DateTimeField()
+    expires_at = DateTimeField(required=True)
+    meta = {
+        'collection': 'idempotency_keys',
+        'indexes': [{'fields': ['expires_at'], 'expireAfterSeconds': 0}],
+    }
+
+class StockHold(Document):
+    # quantity of a product set aside for one user's cart until expires_at; see src.models.inventory
+    user = ReferenceField(User, required=True)
+    product = ReferenceField(Product, required=True)
+    quantity = IntField(required=True)
+    expires_at = DateTimeField(required=True)
+    meta = {
+        'collection': 'stock_holds',
+        'indexes': [
+            {'fields': ['user', 'product'], 'unique': True},
+            # not a TTL index: the sweeper has to give the quantity back before a hold goes
+            'expires_at',
+        ],
+    }
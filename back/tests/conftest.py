@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory database behind the default mongoengine connection."""
+    mongomock = pytest.importorskip('mongomock')
+    import mongoengine
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo >= 4.11 passes sort= to bulk updates, which mongomock does not know yet
+    add_update = BulkOperationBuilder.add_update
+    if 'sort' not in add_update.__code__.co_varnames:
+        BulkOperationBuilder.add_update = lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+    mongoengine.connect('test', host='mongodb://localhost', mongo_client_class=mongomock.MongoClient, uuidRepresentation='standard')
+    yield
+    mongoengine.disconnect()
+    BulkOperationBuilder.add_update = add_update
@@ -0,0 +1,154 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from src.models.inventory import OutOfStock, reserve_stock, hold_stock, undo_hold, release_hold, convert_holds, sweep_expired_holds
+from src.models.user import Product, StockHold
+
+
+def make_product(stock):
+    return Product(name="Pen", description="d", price=2.5, image_url="http://x/p.png", stock=stock).save()
+
+
+def levels(product):
+    product.reload()
+    holds = {hold['user']: hold['quantity'] for hold in StockHold._get_collection().find({'product': product.pk})}
+    return product.stock, product.reserved, holds
+
+
+def expire(user, product):
+    StockHold._get_collection().update_one({'user': user, 'product': product.pk}, {'$set': {'expires_at': datetime.now() - timedelta(seconds=1)}})
+
+
+def test_hold_moves_stock_into_reserved(db):
+    product, user = make_product(5), ObjectId()
+    hold_stock(user, product.pk, 3)
+    hold_stock(user, product.pk, 1)
+    assert levels(product) == (1, 4, {user: 4})
+
+
+def test_hold_refuses_more_than_stock(db):
+    product = make_product(5)
+    hold_stock(ObjectId(), product.pk, 4)
+    with pytest.raises(OutOfStock):
+        hold_stock(ObjectId(), product.pk, 2)
+    assert levels(product)[:2] == (1, 4)
+
+
+def test_undo_hold_only_takes_back_its_own_units(db):
+    product, user = make_product(10), ObjectId()
+    hold_stock(user, product.pk, 4)
+    hold_stock(user, product.pk, 1)
+    undo_hold(user, product.pk, 1)
+    assert levels(product) == (6, 4, {user: 4})
+    undo_hold(user, product.pk, 4)
+    assert levels(product) == (10, 0, {})
+
+
+def test_release_hold_returns_everything(db):
+    product, user = make_product(10), ObjectId()
+    hold_stock(user, product.pk, 4)
+    assert release_hold(user, product.pk) == 4
+    assert release_hold(user, product.pk) == 0
+    assert levels(product) == (10, 0, {})
+
+
+def test_convert_holds_sells_held_units_and_returns_surplus(db):
+    product, user = make_product(10), ObjectId()
+    hold_stock(user, product.pk, 4)
+    assert convert_holds(user, {product.pk: 3}) == {product.pk: 3}
+    # three sold out of reserved, the fourth back on the shelf
+    assert levels(product) == (7, 0, {})
+
+
+def test_convert_holds_skips_lapsed_holds(db):
+    product, user = make_product(10), ObjectId()
+    hold_stock(user, product.pk, 2)
+    expire(user, product)
+    assert convert_holds(user, {product.pk: 2}) == {}
+    assert levels(product) == (8, 2, {user: 2})
+
+
+def test_sweep_releases_only_lapsed_holds(db):
+    product, early, late = make_product(10), ObjectId(), ObjectId()
+    hold_stock(early, product.pk, 3)
+    hold_stock(late, product.pk, 2)
+    expire(early, product)
+    assert sweep_expired_holds() == (1, 1)
+    assert levels(product) == (8, 2, {late: 2})
+    assert sweep_expired_holds() == (0, 0)
+
+
+def test_sweep_works_in_batches(db):
+    product = make_product(10)
+    users = [ObjectId() for _ in range(3)]
+    for user in users:
+        hold_stock(user, product.pk, 1)
+        expire(user, product)
+    assert sweep_expired_holds(batch_size=2) == (2, 2)
+    assert sweep_expired_holds(batch_size=2) == (1, 1)
+    assert levels(product) == (10, 0, {})
+
+
+def test_reserve_takes_every_line(db):
+    pen, ink = make_product(5), make_product(3)
+    reserve_stock({pen.pk: 2, ink.pk: 3})
+    assert (levels(pen)[0], levels(ink)[0]) == (3, 0)
+
+
+def test_reserve_puts_back_lines_before_the_one_that_failed(db):
+    pen, ink, pad = make_product(5), make_product(1), make_product(5)
+    with pytest.raises(OutOfStock) as raised:
+        reserve_stock({pen.pk: 2, ink.pk: 2, pad.pk: 1})
+    assert raised.value.product_id == ink.pk
+    assert [levels(product)[0] for product in (pen, ink, pad)] == [5, 1, 5]
+
+
+def test_reserve_removes_phantom_of_deleted_product(db):
+    pen, gone = make_product(5), make_product(5)
+    gone.delete()
+    with pytest.raises(OutOfStock) as raised:
+        reserve_stock({pen.pk: 2, gone.pk: 1})
+    assert raised.value.product_id == gone.pk
+    assert levels(pen)[0] == 5
+    assert Product._get_collection().count_documents({'_id': gone.pk}) == 0
+
+
+def test_reserve_removes_phantom_when_a_later_line_fails(db):
+    pen, gone, ink = make_product(5), make_product(5), make_product(1)
+    gone.delete()
+    with pytest.raises(OutOfStock) as raised:
+        reserve_stock({pen.pk: 2, gone.pk: 1, ink.pk: 2})
+    assert raised.value.product_id == gone.pk
+    assert [levels(product)[0] for product in (pen, ink)] == [5, 1]
+    assert Product._get_collection().count_documents({'_id': gone.pk}) == 0
+
+
+def test_concurrent_checkouts_never_oversell(db, monkeypatch):
+    from mongomock.collection import Collection
+
+    # mongomock reads then writes; a real server applies each update to a document atomically
+    update, lock = Collection._update, threading.Lock()
+    def atomic_update(self, *args, **kwargs):
+        with lock:
+            return update(self, *args, **kwargs)
+    monkeypatch.setattr(Collection, '_update', atomic_update)
+
+    scarce, plenty = make_product(5), make_product(100)
+    sold, start = [], threading.Barrier(20)
+    def checkout():
+        start.wait()
+        try:
+            reserve_stock({plenty.pk: 1, scarce.pk: 1})
+        except OutOfStock:
+            return
+        sold.append(1)
+    threads = [threading.Thread(target=checkout) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(sold) == 5
+    assert (levels(scarce)[0], levels(plenty)[0]) == (0, 95)
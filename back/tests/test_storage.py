@@ -0,0 +1,37 @@
+import base64
+from io import BytesIO
+
+import pytest
+
+from src.core.storage import InvalidImage, decode_data_url
+
+
+def data_url(mime, data):
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def png_bytes():
+    Image = pytest.importorskip('PIL.Image')
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_raster_image_is_accepted():
+    data, content_type = decode_data_url(data_url('image/png', png_bytes()))
+    assert content_type == 'image/png' and data.startswith(b'\x89PNG')
+
+
+def test_stored_type_comes_from_the_bytes_not_the_claim():
+    assert decode_data_url(data_url('image/jpeg', png_bytes()))[1] == 'image/png'
+
+
+def test_svg_is_rejected():
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+    with pytest.raises(InvalidImage):
+        decode_data_url(data_url('image/svg+xml', svg))
+
+
+def test_bytes_that_are_not_an_image_are_rejected():
+    with pytest.raises(InvalidImage):
+        decode_data_url(data_url('image/png', b'\x89PNG\r\n\x1a\n' + b'not really'))
@@ -34,7 +34,7 @@ const AdminPanel = ({ onProductChange }) => {
   const loadProducts = async () => {
     try {
       setLoading(true);
-      const productsData = await getAllProducts();
+      const productsData = await getAllProducts('description,image_url');
       setProducts(productsData);
     } catch (error) {
       showErrorMessage(error.message);
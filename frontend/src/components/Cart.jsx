@@ -147,7 +147,7 @@ const Cart = () => {
                     <div className="flex items-center gap-6">
                       <div className="w-24 h-24 bg-gradient-to-br from-violet-100 to-purple-200 rounded-2xl overflow-hidden flex-shrink-0 shadow-lg">
                         <img
-                          src={item.product?.image_url || '/images/default-product.jpg'}
+                          src={item.product?.images?.thumb || item.product?.image_url || '/images/default-product.jpg'}
                           alt={item.product?.name}
                           className="w-full h-full object-cover hover:scale-110 transition-transform duration-300"
                           onError={(e) => {
@@ -2,6 +2,7 @@ import React, { useState, useRef } from 'react';
 import { Upload, Camera, Link as LinkIcon, X, Image, Sparkles, CheckCircle, AlertCircle } from 'lucide-react';
 import toast from 'react-hot-toast';
 import { validateImage, fileToBase64, resizeImage, handleImageError } from '../utils/imageUtils';
+import { uploadImage } from '../services/product.service';
 
 const ImageUpload = ({ value, onChange, placeholder = "Upload product image" }) => {
   const [preview, setPreview] = useState(value || '');
@@ -21,7 +22,8 @@ const ImageUpload = ({ value, onChange, placeholder = "Upload product image" })
       setUploading(true);
       const base64Image = await fileToBase64(file);
       setPreview(base64Image);
-      onChange(base64Image);
+      const { url } = await uploadImage(base64Image);
+      onChange(url);
       
     } catch (error) {
       toast.error('Failed to process image');
@@ -2,7 +2,7 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { MapPin, Phone, CreditCard, Truck, ArrowLeft, ShoppingBag, Sparkles, CheckCircle, Package, Star, AlertCircle } from 'lucide-react';
-import { getCart, createOrder, processPayment } from '../services/cart.service';
+import { getCart, createOrder, processPayment, waitForPayment } from '../services/cart.service';
 import { getCurrentUserId } from '../utils/auth';
 import { formatPrice, calculateCartTotal, showErrorMessage, showSuccessMessage, validatePhoneNumber, formatPhoneNumber } from '../utils/helper';
 
@@ -121,7 +121,12 @@ const OrderForm = () => {
     try {
       setProcessing(true);
       const order = await createOrder(cart.id);
-      await processPayment(order.id, paymentMethod);
+      const payment = await waitForPayment((await processPayment(order.id, paymentMethod)).id);
+      if (payment.status === 'failed') {
+        showErrorMessage(payment.failure_reason || 'Payment failed');
+        navigate('/orders');
+        return;
+      }
 
       showSuccessMessage('Order placed successfully!');
       navigate('/orders');
@@ -69,7 +69,9 @@ const ProductCard = ({ product, onAddToCart, onEdit, onDelete }) => {
       </div>
       <div className="relative h-64 bg-gradient-to-br from-slate-100 to-slate-200 overflow-hidden">
         <img
-          src={product.image_url || '/images/default-product.jpg'}
+          src={product.images?.card || product.image_url || '/images/default-product.jpg'}
+          srcSet={product.images?.srcset}
+          sizes="(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
           alt={product.name}
           className="w-full h-full object-fill group-hover:scale-110 transition-transform duration-500"
           onError={(e) => {
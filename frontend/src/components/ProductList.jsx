@@ -1,14 +1,18 @@
 import React, { useState, useEffect } from 'react';
 import { Search, Package, Sparkles, Star, ShoppingBag } from 'lucide-react';
 import ProductCard from './ProductCard';
-import { getAllProducts } from '../services/product.service';
+import { getProductsPage, searchProducts, CARD_FIELDS } from '../services/product.service';
 import { addToCart } from '../services/cart.service';
 import { getCurrentUserId } from '../utils/auth';
 import { showErrorMessage, showSuccessMessage } from '../utils/helper';
 
+const PAGE_SIZE = 20;
+
 const ProductList = ({ onProductEdit, onProductDelete, searchTerm = '' }) => {
   const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filteredProducts, setFilteredProducts] = useState([]);
   
   useEffect(() => {
@@ -16,22 +20,32 @@ const ProductList = ({ onProductEdit, onProductDelete, searchTerm = '' }) => {
   }, []);
   
   useEffect(() => {
-    if (searchTerm.trim() === '') {
+    const term = searchTerm.trim();
+    if (term === '') {
       setFilteredProducts(products);
-    } else {
-      const filtered = products.filter(product =>
-        product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        product.description.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-      setFilteredProducts(filtered);
+      return;
     }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await searchProducts(term);
+        if (!cancelled) setFilteredProducts(results.items);
+      } catch (error) {
+        if (!cancelled) showErrorMessage(error.message);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, [products, searchTerm]);
 
   const loadProducts = async () => {
     try {
       setLoading(true);
-      const productsData = await getAllProducts();
-      setProducts(productsData);
+      const page = await getProductsPage({ limit: PAGE_SIZE, fields: CARD_FIELDS });
+      setProducts(page.items);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       showErrorMessage(error.message);
     } finally {
@@ -39,6 +53,20 @@ const ProductList = ({ onProductEdit, onProductDelete, searchTerm = '' }) => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const page = await getProductsPage({ limit: PAGE_SIZE, cursor: nextCursor, fields: CARD_FIELDS });
+      setProducts((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      showErrorMessage(error.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleAddToCart = async (productId, quantity) => {
     try {
       const userId = getCurrentUserId();
@@ -170,13 +198,24 @@ const ProductList = ({ onProductEdit, onProductDelete, searchTerm = '' }) => {
           />
         ))}
       </div>
+      {!searchTerm && nextCursor && (
+        <div className="mt-12 text-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="bg-gradient-to-r from-violet-600 to-purple-600 text-white px-8 py-3 rounded-2xl font-bold shadow-xl hover:shadow-violet-500/30 transition-all duration-300 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load more products'}
+          </button>
+        </div>
+      )}
       <div className="mt-16 text-center">
         <div className="inline-flex items-center gap-3 bg-white/80 backdrop-blur-xl rounded-full px-8 py-4 border border-violet-200/50 shadow-lg">
           <div className="w-8 h-8 bg-gradient-to-r from-violet-500 to-purple-600 rounded-full flex items-center justify-center">
             <Star className="w-4 h-4 text-white" />
           </div>
           <span className="text-slate-700 font-semibold">
-            Showing {filteredProducts.length} of {products.length} products
+            Showing {filteredProducts.length} product{filteredProducts.length !== 1 ? 's' : ''}{!searchTerm && nextCursor ? ' so far' : ''}
           </span>
           <div className="w-8 h-8 bg-gradient-to-r from-purple-500 to-pink-600 rounded-full flex items-center justify-center">
             <Sparkles className="w-4 h-4 text-white animate-pulse" />
@@ -2,7 +2,6 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Search, ShoppingCart, Settings, Plus, Loader2, Star, ArrowRight, Sparkles, Zap, Heart, TrendingUp } from 'lucide-react';
 import ProductList from '../components/ProductList';
-import { getAllProducts } from '../services/product.service';
 import { addToCart, getCart } from '../services/cart.service';
 import { deleteProduct } from '../services/product.service';
 import { getCurrentUserId, isUserLoggedIn, isAdmin } from '../utils/auth';
@@ -11,7 +10,6 @@ import { showErrorMessage, showSuccessMessage, debounce } from '../utils/helper'
 const Dashboard = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [cartItemsCount, setCartItemsCount] = useState(0);
-  const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
 
   const navigate = useNavigate();
@@ -33,8 +31,7 @@ const Dashboard = () => {
   const loadDashboardData = async () => {
     try {
       setLoading(true);
-      const productsData = await getAllProducts();
-      setProducts(productsData);
+      // ProductList fetches its own first page
       if (isLoggedIn) {
         updateCartCount();
       }
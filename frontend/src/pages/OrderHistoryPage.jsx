@@ -1,13 +1,16 @@
 import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { ArrowLeft, Package, ShoppingBag, CheckCircle, Clock, Calendar, Star, Sparkles, TrendingUp, Award, CreditCard } from 'lucide-react';
-import { getUserOrders } from '../services/cart.service';
+import { getUserOrders, getOrderStats } from '../services/cart.service';
 import { getCurrentUserId, isUserLoggedIn } from '../utils/auth';
 import { formatPrice, formatDate, formatOrderStatus, showErrorMessage } from '../utils/helper';
 
 const OrderHistoryPage = () => {
   const [orders, setOrders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const navigate = useNavigate();
 
   useEffect(() => {
@@ -24,8 +27,10 @@ const OrderHistoryPage = () => {
       const userId = getCurrentUserId();
       if (!userId) return;
 
-      const ordersData = await getUserOrders(userId);
-      setOrders(ordersData || []);
+      const [page, orderStats] = await Promise.all([getUserOrders(userId), getOrderStats(userId)]);
+      setOrders(page.items || []);
+      setNextCursor(page.next_cursor);
+      setStats(orderStats);
     } catch (error) {
       showErrorMessage(error.message);
     } finally {
@@ -33,6 +38,19 @@ const OrderHistoryPage = () => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await getUserOrders(getCurrentUserId(), { cursor: nextCursor });
+      setOrders((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      showErrorMessage(error.message);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="min-h-screen bg-gradient-to-br from-violet-50 via-purple-50 to-fuchsia-100 flex items-center justify-center">
@@ -161,7 +179,7 @@ const OrderHistoryPage = () => {
                       <div key={index} className="flex items-center gap-6 p-6 bg-white/60 backdrop-blur-sm rounded-2xl border border-violet-200/50 hover:shadow-lg transition-all duration-300">
                         <div className="w-20 h-20 bg-gradient-to-br from-slate-100 to-slate-200 rounded-2xl overflow-hidden flex-shrink-0 shadow-lg">
                           <img
-                            src={item.product?.image_url || '/images/default-product.jpg'}
+                            src={item.product?.images?.thumb || item.product?.image_url || '/images/default-product.jpg'}
                             alt={item.product?.name}
                             className="w-full h-full object-cover hover:scale-110 transition-transform duration-300"
                             onError={(e) => {
@@ -203,9 +221,20 @@ const OrderHistoryPage = () => {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <div className="text-center">
+                <button
+                  onClick={loadMoreOrders}
+                  disabled={loadingMore}
+                  className="bg-gradient-to-r from-violet-600 to-purple-600 text-white px-8 py-3 rounded-2xl font-bold shadow-xl hover:shadow-violet-500/30 transition-all duration-300 disabled:opacity-50"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more orders'}
+                </button>
+              </div>
+            )}
           </div>
         )}
-        {orders.length > 0 && (
+        {stats && stats.count > 0 && (
           <div className="mt-16 bg-white/90 backdrop-blur-xl rounded-3xl shadow-2xl border border-violet-200/50 p-8 lg:p-12 relative overflow-hidden">
             <div className="absolute top-0 right-0 w-32 h-32 bg-gradient-to-br from-violet-100 to-purple-100 rounded-full blur-3xl opacity-50"></div>
             
@@ -230,7 +259,7 @@ const OrderHistoryPage = () => {
                     <Package className="w-10 h-10 text-white" />
                   </div>
                   <div className="text-4xl font-black text-blue-600 mb-2">
-                    {orders.length}
+                    {stats.count}
                   </div>
                   <div className="text-lg font-bold text-slate-700">Total Orders</div>
                   <div className="text-sm text-slate-500 mt-1">Orders placed</div>
@@ -241,7 +270,7 @@ const OrderHistoryPage = () => {
                     <CheckCircle className="w-10 h-10 text-white" />
                   </div>
                   <div className="text-4xl font-black text-emerald-600 mb-2">
-                    {orders.filter(o => o.status === 'paid').length}
+                    {stats.statuses.paid?.count || 0}
                   </div>
                   <div className="text-lg font-bold text-slate-700">Completed Orders</div>
                   <div className="text-sm text-slate-500 mt-1">Successfully delivered</div>
@@ -252,7 +281,7 @@ const OrderHistoryPage = () => {
                     <CreditCard className="w-10 h-10 text-white" />
                   </div>
                   <div className="text-4xl font-black text-purple-600 mb-2">
-                    {formatPrice(orders.reduce((sum, order) => sum + order.total_amount, 0))}
+                    {formatPrice(stats.total)}
                   </div>
                   <div className="text-lg font-bold text-slate-700">Total Spent</div>
                   <div className="text-sm text-slate-500 mt-1">Lifetime value</div>
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { getCurrentUser } from '../utils/auth';
 
 const BASE_URL = 'http://localhost:8000';
 const api = axios.create({
@@ -7,6 +8,13 @@ const api = axios.create({
     'Content-Type': 'application/json',
   },
 });
+api.interceptors.request.use((config) => {
+  const token = getCurrentUser()?.access_token;
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
 api.interceptors.response.use(
   (response) => {
     return response;
@@ -28,9 +36,28 @@ api.interceptors.response.use(
       errorMessage = 'Network error - check your connection';
     }
     
-    return Promise.reject(new Error(errorMessage));
+    const failure = new Error(errorMessage);
+    failure.status = error.response?.status;
+    return Promise.reject(failure);
   }
 );
 
+const RETRY_DELAYS = [500, 1500];
+
+// POSTs that must not run twice: every attempt carries the same Idempotency-Key,
+// so a retry after a dropped response gets the original result back
+export const postIdempotent = async (url, data) => {
+  const headers = { 'Idempotency-Key': crypto.randomUUID() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await api.post(url, data, { headers });
+    } catch (error) {
+      const retryable = !error.status || error.status >= 500 || error.status === 409;
+      if (!retryable || attempt >= RETRY_DELAYS.length) throw error;
+      await new Promise((resolve) => setTimeout(resolve, RETRY_DELAYS[attempt]));
+    }
+  }
+};
+
 export default api;
 export { BASE_URL };
\ No newline at end of file
@@ -1,4 +1,4 @@
-import api from './api';
+import api, { postIdempotent } from './api';
 
 export const addToCart = async (userId, productId, quantity) => {
   try {
@@ -32,7 +32,7 @@ export const removeFromCart = async (userId, productId) => {
 
 export const createOrder = async (cartId) => {
   try {
-    const response = await api.post('/orders', {
+    const response = await postIdempotent('/orders', {
       cart_id: cartId
     });
     return response.data;
@@ -41,22 +41,30 @@ export const createOrder = async (cartId) => {
   }
 };
 
-export const getUserOrders = async (userId) => {
-  console.log(userId);
-  
+// one page of orders, newest first: { items, next_cursor }; view 'summary' omits the lines
+export const getUserOrders = async (userId, { cursor, limit = 10, view = 'full' } = {}) => {
   try {
-    const response = await api.get(`/orders/${userId}`);
-    console.log("order response: ", response.data);
-    
+    const response = await api.get(`/orders/${userId}`, {
+      params: { cursor, limit, view },
+    });
     return response.data;
   } catch (error) {
     throw new Error(error.message || 'Failed to fetch orders');
   }
 };
 
+export const getOrderStats = async (userId) => {
+  try {
+    const response = await api.get(`/orders/${userId}/stats`);
+    return response.data;
+  } catch (error) {
+    throw new Error(error.message || 'Failed to fetch order statistics');
+  }
+};
+
 export const processPayment = async (orderId, paymentMethod) => {
   try {
-    const response = await api.post('/payment', {
+    const response = await postIdempotent('/payment', {
       order_id: orderId,
       payment_method: paymentMethod
     });
@@ -64,4 +72,25 @@ export const processPayment = async (orderId, paymentMethod) => {
   } catch (error) {
     throw new Error(error.message || 'Payment processing failed');
   }
-};
\ No newline at end of file
+};
+
+export const getPayment = async (paymentId) => {
+  try {
+    const response = await api.get(`/payment/${paymentId}`);
+    return response.data;
+  } catch (error) {
+    throw new Error(error.message || 'Failed to fetch payment');
+  }
+};
+
+// payments are charged in the background after POST /payment answers 202;
+// poll until the gateway has answered (EventSource cannot send the auth header)
+export const waitForPayment = async (paymentId, { interval = 1000, timeout = 60000 } = {}) => {
+  const deadline = Date.now() + timeout;
+  for (;;) {
+    const payment = await getPayment(paymentId);
+    if (payment.status === 'completed' || payment.status === 'failed') return payment;
+    if (Date.now() >= deadline) throw new Error('Payment is still processing - check your orders later');
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+};
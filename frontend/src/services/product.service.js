@@ -1,13 +1,31 @@
 import api from './api';
 
-export const getAllProducts = async () => {
+// filters: sort ('-created_at' | '-updated_at' | 'price' | '-price'), min_price, max_price, in_stock, facets
+export const getProductsPage = async ({ limit = 20, cursor, fields, ...filters } = {}) => {
   try {
-    const response = await api.get('/products');
+    const response = await api.get('/products', {
+      params: { limit, cursor, fields, ...filters },
+    });
     return response.data;
   } catch (error) {
     throw new Error(error.message || 'Failed to fetch products');
   }
 };
+
+// what ProductCard renders besides the id, name, price and stock every summary carries
+export const CARD_FIELDS = 'description,image_url';
+
+// the whole catalog, for admin views only; pass fields for more than the light summaries
+export const getAllProducts = async (fields) => {
+  const products = [];
+  let cursor;
+  do {
+    const page = await getProductsPage({ limit: 100, cursor, fields });
+    products.push(...page.items);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return products;
+};
 export const getProduct = async (productId) => {
   try {
     const response = await api.get(`/products/${productId}`);
@@ -40,4 +58,31 @@ export const deleteProduct = async (productId) => {
   } catch (error) {
     throw new Error(error.message || 'Failed to delete product');
   }
-};
\ No newline at end of file
+};
+export const uploadImage = async (dataUrl) => {
+  try {
+    const response = await api.post('/images', { data_url: dataUrl });
+    return response.data;
+  } catch (error) {
+    throw new Error(error.message || 'Failed to upload image');
+  }
+};
+
+export const searchProducts = async (q, { limit = 50, page = 1, fields = CARD_FIELDS } = {}) => {
+  try {
+    const response = await api.get('/products/search', {
+      params: { q, limit, page, fields },
+    });
+    return response.data;
+  } catch (error) {
+    throw new Error(error.message || 'Failed to search products');
+  }
+};
+export const autocompleteProducts = async (q, limit = 8) => {
+  try {
+    const response = await api.get('/products/autocomplete', { params: { q, limit } });
+    return response.data.suggestions;
+  } catch (error) {
+    throw new Error(error.message || 'Failed to fetch suggestions');
+  }
+};
@@ -226,6 +226,7 @@ export const formatOrderStatus = (status) => {
   
   const statusMap = {
     pending: 'Pending',
+    payment_processing: 'Processing payment',
     paid: 'Paid',
     completed: 'Completed',
     canceled: 'Canceled',